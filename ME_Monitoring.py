@@ -3,16 +3,30 @@
 
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import snowflake.connector
-import numpy as np
 import os
 import os
+import atexit
+import functools
 import json
 import pickle
+import time
 import streamlit_authenticator as stauth
+import data_store
+import rolling_state
+import snowflake_fetch
+import snowflake_pool
+import data_cache
+import week_index
+import athlete_summary
+import data_explorer
+import squad_summary
+import dashboard_figures
+
+# Filtering, column selection and assign() share memory with the source frame
+# until something writes to it, so slicing the cached data doesn't duplicate it
+pd.set_option('mode.copy_on_write', True)
 
 # Set dark theme as default
 st.markdown("""
@@ -58,45 +72,186 @@ if authentication_status == None:
 
 if authentication_status:
     
-    @st.cache_data
-    def load_training_peaks_data():
-        """Load training peaks data directly from Snowflake"""
+    # The slider goes up to 52 weeks; live queries fetch that window plus the
+    # same weeks last season (which covers the longest rolling-average window)
+    # so nothing older leaves Snowflake
+    MAX_WEEKS = 52
+    ROLLING_LOOKBACK_WEEKS = 8
+    TABLE_NAME = "TRAINING_PEAKS_CYCLING_VW"
+    
+    # Number of athletes whose data is kept in memory per server process;
+    # the least recently viewed athlete is dropped first
+    ATHLETE_CACHE_MAX_ENTRIES = int(os.environ.get('ATHLETE_CACHE_MAX_ENTRIES', 8))
+    
+    # Maximum concurrent Snowflake sessions held open by the server process
+    SNOWFLAKE_POOL_SIZE = int(os.environ.get('SNOWFLAKE_POOL_SIZE', 4))
+    
+    # "swr" serves the last loaded data immediately and refreshes it in the
+    # background every DATA_REFRESH_SECONDS (or when metadata.json changes);
+    # "blocking" queries Snowflake on a cache miss and waits for it
+    DATA_CACHE_MODE = os.environ.get('DATA_CACHE_MODE', 'swr')
+    DATA_REFRESH_SECONDS = int(os.environ.get('DATA_REFRESH_SECONDS', 900))
+    
+    # Timezone whose Monday starts a new week (e.g. Pacific/Auckland); server local time if unset
+    DASHBOARD_TIMEZONE = os.environ.get('DASHBOARD_TIMEZONE') or None
+    
+    # "lazy" draws only the chart picked in the view selector on each rerun;
+    # "tabs" draws every chart into st.tabs, as the dashboard always did
+    DASHBOARD_VIEW_MODE = os.environ.get('DASHBOARD_VIEW_MODE', 'lazy')
+    
+    # "client" sends each athlete chart the full MAX_WEEKS of history with a
+    # range slider, so scrubbing through weeks happens in the browser and the
+    # weeks slider only sets the initial view; "server" sends just the chosen weeks
+    CHART_WINDOW_MODE = os.environ.get('CHART_WINDOW_MODE', 'client')
+    
+    # Number of rendered charts kept per server process and shared by every
+    # session; the least recently used chart is dropped first
+    FIGURE_CACHE_MAX_ENTRIES = int(os.environ.get('FIGURE_CACHE_MAX_ENTRIES', 64))
+    
+    # The squad tab warns when building its summary takes longer than this
+    SQUAD_LATENCY_BUDGET_MS = int(os.environ.get('SQUAD_LATENCY_BUDGET_MS', 500))
+    SQUAD_FACET_COLUMNS = 4
+    
+    # "compact" draws one power zone chart with a Minutes / % switch handled in
+    # the browser; "separate" sends the Power Zones and Power Zones % charts as before
+    ZONE_CHART_MODE = os.environ.get('ZONE_CHART_MODE', 'compact')
+    
+    def get_snowflake_conn_params(quiet=False):
+        """Build Snowflake connection parameters from the Streamlit secrets"""
+        # Check if secrets are available
+        if "snowflake" not in st.secrets:
+            if not quiet:
+                st.warning("⚠️ No Snowflake secrets configured. Trying local data fallback...")
+            raise Exception("No Snowflake secrets")
         
-        # Try Snowflake connection first
-        try:
-            # Check if secrets are available
-            if "snowflake" not in st.secrets:
-                st.warning("⚠️ No Snowflake secrets configured. Trying CSV fallback...")
-                raise Exception("No Snowflake secrets")
-            
-            st.info("🔄 Connecting to Snowflake for live data...")
-            
-            # Snowflake connection parameters
-            conn_params = {
-                "account": st.secrets["snowflake"]["account"],
-                "user": st.secrets["snowflake"]["user"],
-                "role": st.secrets["snowflake"]["role"],
-                "warehouse": st.secrets["snowflake"]["warehouse"],
-                "database": st.secrets["snowflake"]["database"],
-                "schema": st.secrets["snowflake"]["schema"]
-            }
-            
-            # Add authentication - use externalbrowser locally, password when deployed
-            if "authenticator" in st.secrets["snowflake"]:
-                # Local development - use externalbrowser (SSO)
-                conn_params["authenticator"] = st.secrets["snowflake"]["authenticator"]
+        # Snowflake connection parameters
+        conn_params = {
+            "account": st.secrets["snowflake"]["account"],
+            "user": st.secrets["snowflake"]["user"],
+            "role": st.secrets["snowflake"]["role"],
+            "warehouse": st.secrets["snowflake"]["warehouse"],
+            "database": st.secrets["snowflake"]["database"],
+            "schema": st.secrets["snowflake"]["schema"]
+        }
+        
+        # Add authentication - use externalbrowser locally, password when deployed
+        if "authenticator" in st.secrets["snowflake"]:
+            # Local development - use externalbrowser (SSO)
+            conn_params["authenticator"] = st.secrets["snowflake"]["authenticator"]
+            if not quiet:
                 st.info("🔐 Using SSO authentication (externalbrowser)")
-            elif "password" in st.secrets["snowflake"]:
-                # Streamlit Cloud deployment - use password
-                conn_params["password"] = st.secrets["snowflake"]["password"]
+        elif "password" in st.secrets["snowflake"]:
+            # Streamlit Cloud deployment - use password
+            conn_params["password"] = st.secrets["snowflake"]["password"]
+            if not quiet:
                 st.info("🔐 Using password authentication")
-            else:
+        else:
+            if not quiet:
                 st.error("❌ No authentication method found in secrets!")
-                raise Exception("Neither 'authenticator' nor 'password' configured in secrets")
-            
-            conn = snowflake.connector.connect(**conn_params)
-            
-            st.success("✅ Connected to Snowflake successfully!")
+            raise Exception("Neither 'authenticator' nor 'password' configured in secrets")
+        
+        return conn_params
+    
+    def snowflake_pool_is_current(pool):
+        """Keep the cached pool only while the secrets match its credentials; close a rotated-out pool's sessions"""
+        try:
+            current = pool.uses(get_snowflake_conn_params(quiet=True))
+        except Exception:
+            current = False
+        if not current:
+            pool.close_all()
+        return current
+    
+    @st.cache_resource(validate=snowflake_pool_is_current)
+    def get_snowflake_pool():
+        """One connection pool per server process, shared by every session and rerun"""
+        st.info("🔄 Connecting to Snowflake for live data...")
+        pool = snowflake_pool.SnowflakeConnectionPool(
+            get_snowflake_conn_params(),
+            max_connections=SNOWFLAKE_POOL_SIZE
+        )
+        # Log the pooled sessions out when the server stops
+        atexit.register(pool.close_all)
+        return pool
+    
+    def show_snowflake_error(error_msg):
+        """Explain a Snowflake DatabaseError (IP whitelist, bad password, ...)"""
+        st.error("❌ Snowflake Connection Error")
+        
+        # Check for IP whitelist issue
+        if "IP/Token" in error_msg and "not allowed" in error_msg:
+            import re
+            ip_match = re.search(r'IP/Token (\d+\.\d+\.\d+\.\d+)', error_msg)
+            if ip_match:
+                blocked_ip = ip_match.group(1)
+                st.error(f"🚫 **BLOCKED IP ADDRESS: `{blocked_ip}`**")
+                st.warning("This IP needs to be whitelisted by your Snowflake administrator.")
+                st.info(f"Contact your admin and provide this IP: **{blocked_ip}**")
+            else:
+                st.error("IP whitelist issue detected but couldn't extract IP address.")
+            st.code(error_msg, language=None)
+        # Check for authentication/password issues
+        elif "Incorrect username or password" in error_msg or "Invalid username or password" in error_msg:
+            st.error("🔐 **Password Authentication Failed**")
+            st.warning("**Possible reasons:**")
+            st.markdown("""
+            - Incorrect password in secrets file
+            - Username or password has changed
+            - Account is locked or disabled
+            - Password has expired
+            """)
+            st.info("💡 **Solution:** Update your password in the Streamlit secrets configuration.")
+            st.code(error_msg, language=None)
+        elif "Authentication" in error_msg or "credentials" in error_msg.lower():
+            st.error("🔐 **Authentication Failed**")
+            st.warning("There was a problem authenticating with Snowflake.")
+            st.markdown("""
+            **Check:**
+            - Password is correct in secrets file
+            - Account name is correct: `URHWEIA-HPSNZ`
+            - Username is correct: `SAM.BREMER@HPSNZ.ORG.NZ`
+            """)
+            st.code(error_msg, language=None)
+        else:
+            st.error(f"**Database Error:** {error_msg}")
+            st.info("This may be a connection, permission, or configuration issue.")
+    
+    @st.cache_data(ttl=3600)
+    def load_athlete_list():
+        """List the athletes in the view without pulling their training data"""
+        # The synced metadata.json lists every athlete, so usually no query is needed
+        athletes = data_store.load_metadata().get('athletes')
+        if athletes:
+            return sorted(athletes)
+        
+        try:
+            query, params = data_store.build_athlete_list_query(TABLE_NAME)
+            with get_snowflake_pool().connection() as conn:
+                df = snowflake_fetch.fetch_dataframe(conn, query, params)
+            return sorted(df['USER_NAME_FIXED'].dropna().astype(str).unique())
+        except snowflake.connector.errors.DatabaseError as e:
+            show_snowflake_error(str(e))
+        except Exception as e:
+            st.error(f"❌ Unexpected error loading athletes: {e}")
+        
+        # Fall back to the athletes in the local data backup
+        try:
+            df = data_store.load_local_data(columns=['USER_NAME_FIXED'])
+            return sorted(df['USER_NAME_FIXED'].dropna().astype(str).unique()) if not df.empty else []
+        except Exception:
+            return []
+    
+    @st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+    def load_training_data(athlete, since):
+        """Blocking-mode loader: one athlete's data split into workouts and zone seconds"""
+        return data_store.split_workouts(load_training_peaks_data(athlete, since))
+    
+    def load_training_peaks_data(athlete, since):
+        """Load one athlete's training peaks data since a date directly from Snowflake"""
+        
+        # Try Snowflake connection first
+        try:
+            pool = get_snowflake_pool()
             
             # # Explicitly set the warehouse, database, and schema
             # cursor = conn.cursor()
@@ -146,19 +301,18 @@ if authentication_status:
             # if not table_name:
             #     st.error(f"❌ Could not find training peaks table. Available: {', '.join(available_tables)}")
             #     raise Exception("Training peaks table not found")
-            query_columns = "USER_NAME_FIXED, WORKOUT_TYPE, START_TIME, POWER_ZONE_LABEL, POWER_ZONE_MINIMUM, POWER_ZONE_MAXIMUM, POWER_ZONE_SECONDS, TSS, ENERGY"
-            query = f"""
-            SELECT * FROM TRAINING_PEAKS_CYCLING_VW ORDER BY START_TIME DESC
-            """
+            # Only the dashboard columns, for this athlete and window
+            query, params = data_store.build_dashboard_query(TABLE_NAME, athlete=athlete, since=since)
             
             # st.info(f"📊 Querying table: {table_name}...")
-            df = pd.read_sql(query, conn)
-            conn.close()
+            # Borrow a pooled connection instead of logging in again
+            with pool.connection() as conn:
+                df = data_store.apply_schema(snowflake_fetch.fetch_dataframe(conn, query, params))
             
             st.success(f"✅ Loaded {len(df)} rows from Snowflake (live data)")
             
             if df is None or df.empty:
-                st.error(f"❌ No data found in table: {table_name}")
+                st.error(f"❌ No data found in {TABLE_NAME} for {athlete}")
                 raise Exception("No data in Snowflake table")
             
             # Convert date column to datetime with flexible format
@@ -168,752 +322,429 @@ if authentication_status:
             return df
             
         except snowflake.connector.errors.DatabaseError as e:
-            error_msg = str(e)
-            st.error("❌ Snowflake Connection Error")
-            
-            # Check for IP whitelist issue
-            if "IP/Token" in error_msg and "not allowed" in error_msg:
-                import re
-                ip_match = re.search(r'IP/Token (\d+\.\d+\.\d+\.\d+)', error_msg)
-                if ip_match:
-                    blocked_ip = ip_match.group(1)
-                    st.error(f"🚫 **BLOCKED IP ADDRESS: `{blocked_ip}`**")
-                    st.warning("This IP needs to be whitelisted by your Snowflake administrator.")
-                    st.info(f"Contact your admin and provide this IP: **{blocked_ip}**")
-                else:
-                    st.error("IP whitelist issue detected but couldn't extract IP address.")
-                st.code(error_msg, language=None)
-            # Check for authentication/password issues
-            elif "Incorrect username or password" in error_msg or "Invalid username or password" in error_msg:
-                st.error("🔐 **Password Authentication Failed**")
-                st.warning("**Possible reasons:**")
-                st.markdown("""
-                - Incorrect password in secrets file
-                - Username or password has changed
-                - Account is locked or disabled
-                - Password has expired
-                """)
-                st.info("💡 **Solution:** Update your password in the Streamlit secrets configuration.")
-                st.code(error_msg, language=None)
-            elif "Authentication" in error_msg or "credentials" in error_msg.lower():
-                st.error("🔐 **Authentication Failed**")
-                st.warning("There was a problem authenticating with Snowflake.")
-                st.markdown("""
-                **Check:**
-                - Password is correct in secrets file
-                - Account name is correct: `URHWEIA-HPSNZ`
-                - Username is correct: `SAM.BREMER@HPSNZ.ORG.NZ`
-                """)
-                st.code(error_msg, language=None)
-            else:
-                st.error(f"**Database Error:** {error_msg}")
-                st.info("This may be a connection, permission, or configuration issue.")
+            show_snowflake_error(str(e))
             
-            # Fallback to CSV if Snowflake connection fails
+            # Fallback to the synced Parquet store if Snowflake connection fails
             try:
-                st.warning("⚠️ Attempting to load from CSV backup...")
-                csv_path = 'data/training_peaks_data.csv'
-                if os.path.exists(csv_path):
-                    df = pd.read_csv(csv_path)
-                    
+                st.warning("⚠️ Attempting to load from local data backup...")
+                df = data_store.load_local_data(athlete=athlete, columns=data_store.DASHBOARD_COLUMNS, since=since)
+                if not df.empty:
                     # Check metadata for last sync time
                     metadata_path = 'data/metadata.json'
                     if os.path.exists(metadata_path):
                         with open(metadata_path, 'r') as f:
                             metadata = json.load(f)
                         last_sync = metadata.get('last_sync', 'Unknown')
-                        st.info(f"📁 Loaded {len(df)} rows from CSV backup | Last updated: {last_sync}")
+                        st.info(f"📁 Loaded {len(df)} rows from local backup | Last updated: {last_sync}")
                     else:
-                        st.info(f"📁 Loaded {len(df)} rows from CSV backup")
+                        st.info(f"📁 Loaded {len(df)} rows from local backup")
                     
-                    if 'START_TIME' in df.columns:
-                        df['START_TIME'] = pd.to_datetime(df['START_TIME'], format='mixed', errors='coerce')
                     return df
                 else:
-                    st.error("❌ No CSV backup file found.")
+                    st.error("❌ No local data backup found.")
                     return pd.DataFrame()
             except Exception as csv_error:
-                st.error(f"❌ CSV fallback also failed: {csv_error}")
+                st.error(f"❌ Local data fallback also failed: {csv_error}")
                 return pd.DataFrame()
                 
         except Exception as e:
             st.error(f"❌ Unexpected error loading data: {e}")
             
-            # Try CSV fallback for any other error
+            # Try the local data fallback for any other error
             try:
-                st.warning("⚠️ Attempting to load from CSV backup...")
-                csv_path = 'data/training_peaks_data.csv'
-                if os.path.exists(csv_path):
-                    df = pd.read_csv(csv_path)
-                    st.info(f"📁 Loaded {len(df)} rows from CSV backup")
-                    if 'START_TIME' in df.columns:
-                        df['START_TIME'] = pd.to_datetime(df['START_TIME'], format='mixed', errors='coerce')
-                    return df
-                else:
-                    return pd.DataFrame()
+                st.warning("⚠️ Attempting to load from local data backup...")
+                df = data_store.load_local_data(athlete=athlete, columns=data_store.DASHBOARD_COLUMNS, since=since)
+                if not df.empty:
+                    st.info(f"📁 Loaded {len(df)} rows from local backup")
+                return df
             except:
                 return pd.DataFrame()
     
-    # Load data
-    df_training_peaks = load_training_peaks_data()
-    df_training_peaks
-    # Create filtered copy with only rows that have power zone data
-    # Check if POWER_ZONE_LABEL column exists
-    if not df_training_peaks.empty and 'POWER_ZONE_LABEL' in df_training_peaks.columns:
-        df_zones = df_training_peaks[df_training_peaks["POWER_ZONE_LABEL"].notna()].copy()
-    else:
-        df_zones = pd.DataFrame()
-        if not df_training_peaks.empty:
-            st.warning("POWER_ZONE_LABEL column not found in the data. Available columns: " + ", ".join(df_training_peaks.columns.tolist()))
-    
-    # UI Components
-    col1, col2 = st.columns(2)
+    def fetch_live_training_data(pool, athlete, since):
+        """Query one athlete's data from Snowflake - no Streamlit calls, so safe off the script thread"""
+        query, params = data_store.build_dashboard_query(TABLE_NAME, athlete=athlete, since=since)
+        with pool.connection() as conn:
+            return data_store.apply_schema(snowflake_fetch.fetch_dataframe(conn, query, params))
     
-    with col1:
-        # Get unique athletes from the data
-        if not df_training_peaks.empty and 'USER_NAME_FIXED' in df_training_peaks.columns:
-            available_athletes = sorted(df_training_peaks['USER_NAME_FIXED'].unique())
-            selected_athlete = st.selectbox("Select athlete", options=available_athletes)
-        else:
-            st.error("No athlete data available. Please check the data file.")
-            selected_athlete = None
+    def load_local_training_data(athlete, since):
+        """Read one athlete's data from the synced Parquet store"""
+        return data_store.load_local_data(athlete=athlete, columns=data_store.DASHBOARD_COLUMNS, since=since)
     
-    with col2:
-        weeks = st.slider("Select number of past weeks", min_value=4, max_value=52, value=12, step=1)
+    def metadata_version():
+        """Changes whenever a sync rewrites metadata.json"""
+        try:
+            return os.path.getmtime(data_store.METADATA_PATH)
+        except OSError:
+            return None
     
-    # Filter data based on selected athlete and weeks
-    if selected_athlete:
-        # Filter by athlete
-        df_athlete_data = df_training_peaks[df_training_peaks['USER_NAME_FIXED'] == selected_athlete].copy()
+    @st.cache_resource
+    def get_training_data_cache():
+        """Process-wide stale-while-revalidate cache keyed by (athlete, window start)"""
+        try:
+            live = get_snowflake_pool() is not None
+        except Exception:
+            # No Snowflake secrets - serve the synced store, reloading it when a sync lands
+            live = False
         
-        # Check if we have power zone data for this athlete
-        if 'POWER_ZONE_LABEL' in df_athlete_data.columns:
-            df_athlete_data_zones = df_athlete_data[df_athlete_data["POWER_ZONE_LABEL"].notna()].sort_values(["START_TIME","POWER_ZONE_MINIMUM"], ascending=[False,True]).copy()
-        else:
-            df_athlete_data_zones = pd.DataFrame()
-            st.warning("No power zone data available - POWER_ZONE_LABEL column not found.")
-    
-    # Add WEEK column - week starts on Monday, current week = 0
-    if not df_athlete_data_zones.empty:
-        # Define the start of the current week (Monday of this week)
-        today = pd.Timestamp.now().normalize()
-        days_since_monday = today.weekday()  # Monday = 0, Sunday = 6
-        current_week_start = today - pd.Timedelta(days=days_since_monday)
-        
-        # Calculate week number for each row
-        # For each date, find its Monday (start of its week), then count weeks from current Monday
-        df_athlete_data_zones['WEEKS_PAST'] = df_athlete_data_zones['START_TIME'].apply(
-            lambda x: (current_week_start - (pd.Timestamp(x).normalize() - pd.Timedelta(days=pd.Timestamp(x).weekday()))).days // 7
-        )
+        # Snapshots hold the split workouts / zone-seconds tables, not the zone-exploded view
+        def refresh(key):
+            athlete, since = key
+            if live:
+                # Look the pool up each time so a credential rotation swaps it out here too
+                df = fetch_live_training_data(get_snowflake_pool(), athlete, since)
+                if not df.empty:
+                    return data_store.split_workouts(df), 'Snowflake (live)'
+            return data_store.split_workouts(load_local_training_data(athlete, since)), 'local backup'
         
-        # Reorder columns to put WEEKS_PAST in 7th position
-        cols = df_athlete_data_zones.columns.tolist()
-        if 'WEEKS_PAST' in cols:
-            cols.remove('WEEKS_PAST')
-            cols.insert(6, 'WEEKS_PAST')  # 7th position (0-indexed is 6)
-            df_athlete_data_zones = df_athlete_data_zones[cols]
-        
-        # Filter to show only recent weeks (1 to weeks)
-        recent_weeks = list(range(1, weeks + 1))  # weeks 1 to N
-        
-        df_athlete_data_zones_restrict = df_athlete_data_zones[
-            df_athlete_data_zones['WEEKS_PAST'].isin(recent_weeks)
-        ].copy()
-    df_athlete_data_zones
-    df_athlete_data_zones_restrict
-    today
-    # Create tabs for different chart types
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Training Time", "TSS", "Energy (kJ)", "Power Zones", "Power Zones %"])
-    
-    # TAB 1: Weekly Training Time
-    with tab1:
-        if not df_athlete_data_zones_restrict.empty and 'POWER_ZONE_SECONDS' in df_athlete_data_zones_restrict.columns:
-            
-            # Group by weeks and sum the power zone seconds for restricted data
-            weekly_time = df_athlete_data_zones_restrict.groupby('WEEKS_PAST')['POWER_ZONE_SECONDS'].sum().reset_index()
-            
-            # Convert seconds to hours and round to 2 decimal places
-            weekly_time['HOURS'] = (weekly_time['POWER_ZONE_SECONDS'] / 3600).round(2)
-            
-            # Calculate the Monday date for each week
-            weekly_time['WEEK_START_DATE'] = weekly_time['WEEKS_PAST'].apply(
-                lambda weeks_back: current_week_start - pd.Timedelta(weeks=weeks_back)
-            )
-        
-        # Sort by weeks_past for proper display
-        weekly_time = weekly_time.sort_values('WEEKS_PAST')
-        
-        # Calculate rolling 4-week average from the original (unrestricted) data
-        if not df_athlete_data_zones.empty:
-            # Group all data by weeks and sum the power zone seconds
-            all_weekly_time = df_athlete_data_zones.groupby('WEEKS_PAST')['POWER_ZONE_SECONDS'].sum().reset_index()
-            all_weekly_time['HOURS'] = (all_weekly_time['POWER_ZONE_SECONDS'] / 3600).round(2)
-            all_weekly_time = all_weekly_time.sort_values('WEEKS_PAST')
-            
-            # Calculate 4-week rolling average
-            all_weekly_time['ROLLING_4WK_AVG'] = all_weekly_time['HOURS'].rolling(window=4, min_periods=1).mean().round(2)
-            
-            # Calculate 8-week centrally weighted rolling average
-            def weighted_rolling_8week(series):
-                """Calculate 8-week centrally weighted rolling average"""
-                weights = [1, 2, 3, 4, 4, 3, 2, 1]  # Central weighting: 1st & 8th=1, 2nd & 7th=2, etc.
-                result = []
-                
-                for i in range(len(series)):
-                    if i < 7:  # Not enough data for full 8-week window
-                        # Use available data with proportional weighting
-                        available_data = series.iloc[:i+1]
-                        available_weights = weights[-len(available_data):]
-                        if len(available_data) > 0:
-                            weighted_avg = (available_data * available_weights).sum() / sum(available_weights)
-                            result.append(weighted_avg)
-                        else:
-                            result.append(np.nan)
-                    else:
-                        # Full 8-week window available
-                        window_data = series.iloc[i-7:i+1]
-                        weighted_avg = (window_data * weights).sum() / sum(weights)
-                        result.append(weighted_avg)
-                
-                return pd.Series(result, index=series.index)
-            
-            all_weekly_time['ROLLING_8WK_WEIGHTED_AVG'] = weighted_rolling_8week(all_weekly_time['HOURS']).round(2)
-            
-            # Calculate 8-week log average (linearly increasing weights)
-            def log_rolling_8week(series):
-                """Calculate 8-week log rolling average with linearly increasing weights"""
-                weights = [1, 2, 3, 4, 5, 6, 7, 8]  # Increasing weights: 1st week=1, 8th week=8
-                result = []
-                
-                for i in range(len(series)):
-                    if i < 7:  # Not enough data for full 8-week window
-                        # Use available data with proportional weighting
-                        available_data = series.iloc[:i+1]
-                        available_weights = weights[:len(available_data)]
-                        if len(available_data) > 0:
-                            weighted_avg = (available_data * available_weights).sum() / sum(available_weights)
-                            result.append(weighted_avg)
-                        else:
-                            result.append(np.nan)
-                    else:
-                        # Full 8-week window available
-                        window_data = series.iloc[i-7:i+1]
-                        weighted_avg = (window_data * weights).sum() / sum(weights)
-                        result.append(weighted_avg)
-                
-                return pd.Series(result, index=series.index)
-            
-            all_weekly_time['ROLLING_8WK_LOG_AVG'] = log_rolling_8week(all_weekly_time['HOURS']).round(2)
-            
-            # Calculate week start dates for rolling average
-            all_weekly_time['WEEK_START_DATE'] = all_weekly_time['WEEKS_PAST'].apply(
-                lambda weeks_back: current_week_start - pd.Timedelta(weeks=weeks_back)
-            )
-            
-            # Filter rolling average data to match the display range
-            rolling_avg_display = all_weekly_time[
-                all_weekly_time['WEEKS_PAST'].isin(weekly_time['WEEKS_PAST'])
-            ].copy()
-        
-            # Create the combined chart using plotly graph objects for more control
-            st.subheader("Weekly Training Time with Rolling Averages")
-            fig = go.Figure()
-            
-            # Add bar chart for weekly hours
-            fig.add_trace(go.Bar(
-                x=weekly_time['WEEK_START_DATE'],
-                y=weekly_time['HOURS'],
-                name='Weekly Hours',
-                marker_color='lightblue',
-                hovertemplate='Hours: %{y}<extra></extra>'
-            ))
-            
-            # Add rolling average lines if data exists
-            if not df_athlete_data_zones.empty and len(rolling_avg_display) > 0:
-                # 4-week rolling average
-                fig.add_trace(go.Scatter(
-                    x=rolling_avg_display['WEEK_START_DATE'],
-                    y=rolling_avg_display['ROLLING_4WK_AVG'],
-                    mode='lines+markers',
-                    name='4-Week Rolling Average',
-                    line=dict(color='red', width=3),
-                    marker=dict(size=6),
-                    hovertemplate='4-Week Avg: %{y} hours<extra></extra>'
-                ))
-                
-                # 8-week centrally weighted rolling average
-                fig.add_trace(go.Scatter(
-                    x=rolling_avg_display['WEEK_START_DATE'],
-                    y=rolling_avg_display['ROLLING_8WK_WEIGHTED_AVG'],
-                    mode='lines+markers',
-                    name='8-Week Weighted Average',
-                    line=dict(color='green', width=3),
-                    marker=dict(size=6),
-                    hovertemplate='8-Week Weighted Avg: %{y} hours<extra></extra>'
-                ))
-                
-                # 8-week log average
-                fig.add_trace(go.Scatter(
-                    x=rolling_avg_display['WEEK_START_DATE'],
-                    y=rolling_avg_display['ROLLING_8WK_LOG_AVG'],
-                    mode='lines+markers',
-                    name='8-Week Log Average',
-                    line=dict(color='purple', width=3),
-                    marker=dict(size=6),
-                    hovertemplate='8-Week Log Avg: %{y} hours<extra></extra>'
-                ))
-            
-            # Update layout for better appearance
-            fig.update_layout(
-                # title=f'Last {weeks} weeks',
-                xaxis_title="Week Starting (Monday)",
-                yaxis_title="Training Time (Hours)",
-                showlegend=True,
-                hovermode='x unified'
-            )
-            
-            # Format x-axis to show dates nicely
-            fig.update_xaxes(tickformat="%Y-%m-%d")
-            
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.warning("No power zone data available for the selected athlete and time period.")
-    
-    # TAB 2: Weekly TSS
-    with tab2:
-        if not df_athlete_data_zones_restrict.empty and 'TSS' in df_athlete_data_zones_restrict.columns:
-            
-            # Group by weeks and sum the TSS for restricted data
-            weekly_tss = df_athlete_data_zones_restrict.groupby('WEEKS_PAST')['TSS'].sum().reset_index()
-            weekly_tss['TSS'] = weekly_tss['TSS'].round(1)
-            
-            # Calculate the Monday date for each week
-            weekly_tss['WEEK_START_DATE'] = weekly_tss['WEEKS_PAST'].apply(
-                lambda weeks_back: current_week_start - pd.Timedelta(weeks=weeks_back)
-            )
-            
-            # Sort by weeks_past for proper display
-            weekly_tss = weekly_tss.sort_values('WEEKS_PAST')
-        
-        # Calculate rolling averages from the original (unrestricted) data
-        if not df_athlete_data_zones.empty:
-            # Group all data by weeks and sum the TSS
-            all_weekly_tss = df_athlete_data_zones.groupby('WEEKS_PAST')['TSS'].sum().reset_index()
-            all_weekly_tss['TSS'] = all_weekly_tss['TSS'].round(1)
-            all_weekly_tss = all_weekly_tss.sort_values('WEEKS_PAST')
-            
-            # Calculate rolling averages
-            all_weekly_tss['ROLLING_4WK_AVG'] = all_weekly_tss['TSS'].rolling(window=4, min_periods=1).mean().round(1)
-            
-            # 8-week centrally weighted average
-            def weighted_rolling_8week_tss(series):
-                weights = [1, 2, 3, 4, 4, 3, 2, 1]
-                result = []
-                for i in range(len(series)):
-                    if i < 7:
-                        available_data = series.iloc[:i+1]
-                        available_weights = weights[-len(available_data):]
-                        if len(available_data) > 0:
-                            weighted_avg = (available_data * available_weights).sum() / sum(available_weights)
-                            result.append(weighted_avg)
-                        else:
-                            result.append(np.nan)
-                    else:
-                        window_data = series.iloc[i-7:i+1]
-                        weighted_avg = (window_data * weights).sum() / sum(weights)
-                        result.append(weighted_avg)
-                return pd.Series(result, index=series.index)
-            
-            # 8-week log average
-            def log_rolling_8week_tss(series):
-                weights = [1, 2, 3, 4, 5, 6, 7, 8]
-                result = []
-                for i in range(len(series)):
-                    if i < 7:
-                        available_data = series.iloc[:i+1]
-                        available_weights = weights[:len(available_data)]
-                        if len(available_data) > 0:
-                            weighted_avg = (available_data * available_weights).sum() / sum(available_weights)
-                            result.append(weighted_avg)
-                        else:
-                            result.append(np.nan)
-                    else:
-                        window_data = series.iloc[i-7:i+1]
-                        weighted_avg = (window_data * weights).sum() / sum(weights)
-                        result.append(weighted_avg)
-                return pd.Series(result, index=series.index)
-            
-            all_weekly_tss['ROLLING_8WK_WEIGHTED_AVG'] = weighted_rolling_8week_tss(all_weekly_tss['TSS']).round(1)
-            all_weekly_tss['ROLLING_8WK_LOG_AVG'] = log_rolling_8week_tss(all_weekly_tss['TSS']).round(1)
-            
-            # Calculate week start dates for rolling average
-            all_weekly_tss['WEEK_START_DATE'] = all_weekly_tss['WEEKS_PAST'].apply(
-                lambda weeks_back: current_week_start - pd.Timedelta(weeks=weeks_back)
-            )
-            
-            # Filter rolling average data to match the display range
-            rolling_avg_tss_display = all_weekly_tss[
-                all_weekly_tss['WEEKS_PAST'].isin(weekly_tss['WEEKS_PAST'])
-            ].copy()
-        
-        # Create TSS chart
-        st.subheader("Weekly TSS with Rolling Averages")
-        fig_tss = go.Figure()
-        
-        # Add bar chart for weekly TSS
-        fig_tss.add_trace(go.Bar(
-            x=weekly_tss['WEEK_START_DATE'],
-            y=weekly_tss['TSS'],
-            name='Weekly TSS',
-            marker_color='lightcoral',
-            hovertemplate='TSS: %{y}<extra></extra>'
-        ))
-        
-        # Add rolling average lines if data exists
-        if not df_athlete_data_zones.empty and len(rolling_avg_tss_display) > 0:
-            fig_tss.add_trace(go.Scatter(
-                x=rolling_avg_tss_display['WEEK_START_DATE'],
-                y=rolling_avg_tss_display['ROLLING_4WK_AVG'],
-                mode='lines+markers',
-                name='4-Week Rolling Average',
-                line=dict(color='red', width=3),
-                marker=dict(size=6),
-                hovertemplate='4-Week Avg: %{y} TSS<extra></extra>'
-            ))
-            
-            fig_tss.add_trace(go.Scatter(
-                x=rolling_avg_tss_display['WEEK_START_DATE'],
-                y=rolling_avg_tss_display['ROLLING_8WK_WEIGHTED_AVG'],
-                mode='lines+markers',
-                name='8-Week Weighted Average',
-                line=dict(color='green', width=3),
-                marker=dict(size=6),
-                hovertemplate='8-Week Weighted Avg: %{y} TSS<extra></extra>'
-            ))
-            
-            fig_tss.add_trace(go.Scatter(
-                x=rolling_avg_tss_display['WEEK_START_DATE'],
-                y=rolling_avg_tss_display['ROLLING_8WK_LOG_AVG'],
-                mode='lines+markers',
-                name='8-Week Log Average',
-                line=dict(color='purple', width=3),
-                marker=dict(size=6),
-                hovertemplate='8-Week Log Avg: %{y} TSS<extra></extra>'
-            ))
-        
-        fig_tss.update_layout(
-            # title=f'Last {weeks} weeks',
-            xaxis_title="Week Starting (Monday)",
-            yaxis_title="TSS",
-            showlegend=True,
-            hovermode='x unified'
-        )
+        def initial(key):
+            return data_store.split_workouts(load_local_training_data(*key)), 'local backup'
         
-        fig_tss.update_xaxes(tickformat="%Y-%m-%d")
-        st.plotly_chart(fig_tss, use_container_width=True)
+        return data_cache.StaleWhileRevalidateCache(
+            refresh,
+            initial=initial if live else None,
+            version_token=metadata_version,
+            max_entries=ATHLETE_CACHE_MAX_ENTRIES,
+            refresh_interval=DATA_REFRESH_SECONDS
+        )
     
-    # TAB 3: Weekly Energy
-    with tab3:
-        if not df_athlete_data_zones_restrict.empty and 'ENERGY' in df_athlete_data_zones_restrict.columns:
-            
-            # Group by weeks and sum the ENERGY for restricted data
-            weekly_energy = df_athlete_data_zones_restrict.groupby('WEEKS_PAST')['ENERGY'].sum().reset_index()
-            weekly_energy['ENERGY_KJ'] = (weekly_energy['ENERGY'] / 1000).round(1)  # Convert to kJ
+    @st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+    def load_synced_weekly_summary(athlete, since, data_version):
+        """One athlete's rows of the weekly summary tables written by the sync"""
+        return data_store.load_weekly_summary(athlete=athlete, since=since)
+    
+    @st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+    def summarise_training_data(_training, athlete, since, data_version):
+        """Build the weekly summary from live data - once per data version, not on every rerun"""
+        return data_store.build_weekly_summary(_training)
+    
+    @st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+    def load_synced_rolling_state(athlete, data_version):
+        """One athlete's stored rolling averages, written by the sync alongside the weekly summary"""
+        return rolling_state.load_rolling_state(athlete=athlete)
+    
+    def get_athlete_weekly_summary(training, athlete, since, source, data_version):
+        """Weekly totals and zone seconds: the synced tables for local data, aggregated once for live data"""
+        if source == 'local backup':
+            summary = load_synced_weekly_summary(athlete, since, metadata_version())
+            if summary is not None:
+                return summary
+        return summarise_training_data(training, athlete, since, data_version)
+    
+    @st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES * 4)
+    def get_athlete_summary(_weekly_summary, athlete, weeks, this_week_start, data_version, _state=None):
+        """
+        Everything the five tabs render, built in one pass and reused across
+        reruns; the rolling averages come from the synced state when it matches
+        """
+        return athlete_summary.build_athlete_summary(_weekly_summary, this_week_start, weeks, _state)
+    
+    @st.cache_resource(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+    def get_zone_rows(_training, athlete, this_week_start, data_version):
+        """
+        The athlete's zone rows joined to their workouts, built once per data
+        version and shared without copying (nothing modifies them), so paging
+        the raw data explorer doesn't redo the join on every rerun
+        """
+        return data_store.athlete_zone_rows(_training, this_week_start)
+    
+    @st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+    def get_memory_report(_training, athlete, since, data_version):
+        """Per-column memory of the athlete's cached frames, sized once per data version"""
+        return data_store.memory_report(_training.workouts), data_store.memory_report(_training.zones)
+    
+    @st.cache_data(max_entries=4)
+    def get_squad_summary(since, weeks, this_week_start, data_version):
+        """Every athlete's weekly metrics and zone percentages from the synced tables (or the local store)"""
+        weekly = data_store.load_weekly_summary(since=since)
+        if weekly is None:
+            training = data_store.split_workouts(data_store.load_local_data(columns=data_store.DASHBOARD_COLUMNS, since=since))
+            weekly = data_store.build_weekly_summary(training)
+        return squad_summary.build_squad_summary(weekly, this_week_start, weeks)
+    
+    @st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES)
+    def get_figure(athlete, weeks, metric, this_week_start, data_version, _build):
+        """
+        A chart built once per (athlete, weeks, metric, current week, data version)
+        and shared by every session. Cached figures are never modified; a sync
+        changes data_version, so charts of the old data are no longer asked for
+        and age out of the cache. st.plotly_chart still copies the figure to a
+        dict and serialises it on each render, about 5 ms a chart against 50 ms
+        to build it (benchmark_payload.py). A cached dict would be worse: Streamlit
+        re-validates dicts through go.Figure, about 25 ms a chart.
+        """
+        return _build()
+    
+    EXPLORER_PAGE_SIZES = [25, 50, 100, 250]
+    
+    @st.fragment
+    def raw_data_explorer(training, athlete, data_version, today, this_week_start, weeks):
+        """
+        The raw rows behind the charts, filtered and paged on the server so the
+        browser only receives the page on screen. Nothing is sent until the
+        toggle is switched on, and paging reruns only this fragment.
+        """
+        if training.empty or not st.toggle("Show raw data", key="explorer_on"):
+            return
         
-        # Calculate the Monday date for each week
-        weekly_energy['WEEK_START_DATE'] = weekly_energy['WEEKS_PAST'].apply(
-            lambda weeks_back: current_week_start - pd.Timedelta(weeks=weeks_back)
-        )
+        def zone_rows():
+            # Newest first, with WEEKS_PAST (week starts on Monday, current week = 0)
+            if training.zones.empty:
+                return pd.DataFrame()
+            return get_zone_rows(training, athlete, this_week_start, data_version)
         
-        # Sort by weeks_past for proper display
-        weekly_energy = weekly_energy.sort_values('WEEKS_PAST')
+        def recent_zone_rows():
+            # Only recent weeks (1 to weeks) - a slice of the zone rows, not a copy
+            rows = zone_rows()
+            return data_store.slice_recent_weeks(rows, this_week_start, weeks) if not rows.empty else rows
         
-        # Calculate rolling averages from the original (unrestricted) data
-        if not df_athlete_data_zones.empty:
-            # Group all data by weeks and sum the ENERGY
-            all_weekly_energy = df_athlete_data_zones.groupby('WEEKS_PAST')['ENERGY'].sum().reset_index()
-            all_weekly_energy['ENERGY_KJ'] = (all_weekly_energy['ENERGY'] / 1000).round(1)
-            all_weekly_energy = all_weekly_energy.sort_values('WEEKS_PAST')
-            
-            # Calculate rolling averages
-            all_weekly_energy['ROLLING_4WK_AVG'] = all_weekly_energy['ENERGY_KJ'].rolling(window=4, min_periods=1).mean().round(1)
-            
-            # 8-week centrally weighted average
-            def weighted_rolling_8week_energy(series):
-                weights = [1, 2, 3, 4, 4, 3, 2, 1]
-                result = []
-                for i in range(len(series)):
-                    if i < 7:
-                        available_data = series.iloc[:i+1]
-                        available_weights = weights[-len(available_data):]
-                        if len(available_data) > 0:
-                            weighted_avg = (available_data * available_weights).sum() / sum(available_weights)
-                            result.append(weighted_avg)
-                        else:
-                            result.append(np.nan)
-                    else:
-                        window_data = series.iloc[i-7:i+1]
-                        weighted_avg = (window_data * weights).sum() / sum(weights)
-                        result.append(weighted_avg)
-                return pd.Series(result, index=series.index)
-            
-            # 8-week log average
-            def log_rolling_8week_energy(series):
-                weights = [1, 2, 3, 4, 5, 6, 7, 8]
-                result = []
-                for i in range(len(series)):
-                    if i < 7:
-                        available_data = series.iloc[:i+1]
-                        available_weights = weights[:len(available_data)]
-                        if len(available_data) > 0:
-                            weighted_avg = (available_data * available_weights).sum() / sum(available_weights)
-                            result.append(weighted_avg)
-                        else:
-                            result.append(np.nan)
-                    else:
-                        window_data = series.iloc[i-7:i+1]
-                        weighted_avg = (window_data * weights).sum() / sum(weights)
-                        result.append(weighted_avg)
-                return pd.Series(result, index=series.index)
-            
-            all_weekly_energy['ROLLING_8WK_WEIGHTED_AVG'] = weighted_rolling_8week_energy(all_weekly_energy['ENERGY_KJ']).round(1)
-            all_weekly_energy['ROLLING_8WK_LOG_AVG'] = log_rolling_8week_energy(all_weekly_energy['ENERGY_KJ']).round(1)
-            
-            # Calculate week start dates for rolling average
-            all_weekly_energy['WEEK_START_DATE'] = all_weekly_energy['WEEKS_PAST'].apply(
-                lambda weeks_back: current_week_start - pd.Timedelta(weeks=weeks_back)
-            )
-            
-            # Filter rolling average data to match the display range
-            rolling_avg_energy_display = all_weekly_energy[
-                all_weekly_energy['WEEKS_PAST'].isin(weekly_energy['WEEKS_PAST'])
-            ].copy()
-        
-        # Create Energy chart
-        st.subheader("Weekly Energy (kJ) with Rolling Averages")
-        fig_energy = go.Figure()
-        
-        # Add bar chart for weekly energy
-        fig_energy.add_trace(go.Bar(
-            x=weekly_energy['WEEK_START_DATE'],
-            y=weekly_energy['ENERGY_KJ'],
-            name='Weekly Energy (kJ)',
-            marker_color='lightgreen',
-            hovertemplate='Energy: %{y} kJ<extra></extra>'
-        ))
-        
-        # Add rolling average lines if data exists
-        if not df_athlete_data_zones.empty and len(rolling_avg_energy_display) > 0:
-            fig_energy.add_trace(go.Scatter(
-                x=rolling_avg_energy_display['WEEK_START_DATE'],
-                y=rolling_avg_energy_display['ROLLING_4WK_AVG'],
-                mode='lines+markers',
-                name='4-Week Rolling Average',
-                line=dict(color='red', width=3),
-                marker=dict(size=6),
-                hovertemplate='4-Week Avg: %{y} kJ<extra></extra>'
-            ))
-            
-            fig_energy.add_trace(go.Scatter(
-                x=rolling_avg_energy_display['WEEK_START_DATE'],
-                y=rolling_avg_energy_display['ROLLING_8WK_WEIGHTED_AVG'],
-                mode='lines+markers',
-                name='8-Week Weighted Average',
-                line=dict(color='green', width=3),
-                marker=dict(size=6),
-                hovertemplate='8-Week Weighted Avg: %{y} kJ<extra></extra>'
-            ))
-            
-            fig_energy.add_trace(go.Scatter(
-                x=rolling_avg_energy_display['WEEK_START_DATE'],
-                y=rolling_avg_energy_display['ROLLING_8WK_LOG_AVG'],
-                mode='lines+markers',
-                name='8-Week Log Average',
-                line=dict(color='purple', width=3),
-                marker=dict(size=6),
-                hovertemplate='8-Week Log Avg: %{y} kJ<extra></extra>'
-            ))
-        
-        fig_energy.update_layout(
-            # title=f'Last {weeks} weeks',
-            xaxis_title="Week Starting (Monday)",
-            yaxis_title="Energy (kJ)",
-            showlegend=True,
-            hovermode='x unified'
-        )
+        tables = {
+            "Workouts": lambda: training.workouts,
+            "Zone rows": zone_rows,
+            f"Zone rows (last {weeks} weeks)": recent_zone_rows,
+        }
+        table = st.radio("Table", list(tables), horizontal=True, key="explorer_table")
+        df = tables[table]()
+        if df.empty:
+            st.write("No rows in this table for the selected athlete.")
+            return
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            columns = st.multiselect("Columns", list(df.columns), default=list(df.columns), key=f"explorer_columns_{table}")
+        with col2:
+            filter_column = st.selectbox("Filter on", list(df.columns), key=f"explorer_filter_column_{table}")
+        with col3:
+            filter_text = st.text_input("Contains", key=f"explorer_filter_text_{table}")
+        if filter_text:
+            df = data_explorer.filter_rows(df, filter_column, filter_text)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            page_size = st.selectbox("Rows per page", EXPLORER_PAGE_SIZES, key="explorer_page_size")
+        with col2:
+            # Keyed on the filter so a narrower result starts again at page 1
+            pages = data_explorer.page_count(len(df), page_size)
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                                   key=f"explorer_page_{table}_{filter_column}_{filter_text}_{page_size}")
         
-        fig_energy.update_xaxes(tickformat="%Y-%m-%d")
-        st.plotly_chart(fig_energy, use_container_width=True)
+        st.dataframe(data_explorer.get_page(df, page, page_size, columns or None), use_container_width=True)
+        first = min(len(df), (page - 1) * page_size + 1)
+        st.caption(f"Rows {first}-{min(len(df), page * page_size)} of {len(df)} | "
+                   f"today {today:%Y-%m-%d}, current week starts {this_week_start:%Y-%m-%d}")
     
-    # TAB 4: Power Zone Distribution (Raw)
-    with tab4:
-        st.subheader("Power Zone Distribution")
+    @st.fragment
+    def weekly_charts(selected_athlete, training, data_source, data_version,
+                      today, current_week_start, data_window_start):
+        """
+        Weeks slider and charts for the loaded athlete. Moving the slider or
+        switching views reruns only this fragment - login and the athlete's
+        data are left as they are.
+        """
+        col1, col2 = st.columns(2)
         
-        if not df_athlete_data_zones_restrict.empty:
-            # Check if we have the required columns
-            if 'POWER_ZONE_LABEL' in df_athlete_data_zones_restrict.columns and 'POWER_ZONE_SECONDS' in df_athlete_data_zones_restrict.columns:
-                # Convert seconds to minutes for better readability
-                df_zones_copy = df_athlete_data_zones_restrict.copy()
-                df_zones_copy['Power Zone Minutes'] = (df_zones_copy['POWER_ZONE_SECONDS'] / 60).round(2)
-            
-            # Group by Power Zone Label and sum the minutes
-            zone_summary = df_zones_copy.groupby('POWER_ZONE_LABEL')['Power Zone Minutes'].sum().reset_index()
-            zone_summary = zone_summary.sort_values('Power Zone Minutes', ascending=False)
-            zone_summary['Power Zone Minutes'] = zone_summary['Power Zone Minutes'].round(2)
-            
-            # Show weekly breakdown using START_TIME column
-            if 'START_TIME' in df_athlete_data_zones_restrict.columns:
-                # Calculate week start date (Monday) for each date using WEEKS_PAST
-                df_zones_copy['Week_Start'] = df_zones_copy['WEEKS_PAST'].apply(
-                    lambda weeks_back: current_week_start - pd.Timedelta(weeks=weeks_back)
-                )
-                
-                # Group by week start and power zone
-                weekly_zones = df_zones_copy.groupby(['Week_Start', 'POWER_ZONE_LABEL'])['Power Zone Minutes'].sum().reset_index()
-                weekly_zones['Power Zone Minutes'] = weekly_zones['Power Zone Minutes'].round(2)
-                
-                # Create mapping from Power Zone Label to power ranges (without decimal points)
-                zone_mapping = df_zones_copy.groupby('POWER_ZONE_LABEL').agg({
-                    'POWER_ZONE_MINIMUM': 'first',
-                    'POWER_ZONE_MAXIMUM': 'first'
-                }).reset_index()
-                
-                # Filter out zones with invalid power ranges
-                valid_zones = zone_mapping[zone_mapping['POWER_ZONE_MINIMUM'].notna() & zone_mapping['POWER_ZONE_MAXIMUM'].notna()]['POWER_ZONE_LABEL'].tolist()
-                weekly_zones = weekly_zones[weekly_zones['POWER_ZONE_LABEL'].isin(valid_zones)]
-                zone_mapping = zone_mapping[zone_mapping['POWER_ZONE_LABEL'].isin(valid_zones)]
-                
-                # Handle NaN values before converting to int
-                zone_mapping['Power Range'] = zone_mapping.apply(
-                    lambda row: f"{int(row['POWER_ZONE_MINIMUM'])}-{int(row['POWER_ZONE_MAXIMUM'])}W" 
-                    if pd.notna(row['POWER_ZONE_MINIMUM']) and pd.notna(row['POWER_ZONE_MAXIMUM']) 
-                    else row['POWER_ZONE_LABEL'], 
-                    axis=1
-                )
-                zone_map_dict = dict(zip(zone_mapping['POWER_ZONE_LABEL'], zone_mapping['Power Range']))
-                
-                # Pivot to get zones as columns
-                weekly_pivot = weekly_zones.pivot(index='Week_Start', columns='POWER_ZONE_LABEL', values='Power Zone Minutes').fillna(0)
-                
-                # Sort columns by Power Zone Minimum to get lowest zones at bottom
-                zone_order = zone_mapping.sort_values('POWER_ZONE_MINIMUM')['POWER_ZONE_LABEL'].tolist()
-                weekly_pivot = weekly_pivot.reindex(columns=[col for col in zone_order if col in weekly_pivot.columns])
-                
-                # Create stacked bar chart for weekly view
-                fig_weekly = go.Figure()
-                
-                colors = ["#485E89", "#4B8C67", "#24755B", '#B0D581', '#46BFB7', '#D2F2F9', '#9DE2F1', "#15C7EF"]
-                
-                for i, zone in enumerate(weekly_pivot.columns):
-                    power_range = zone_map_dict.get(zone, zone)  # Use power range if available, otherwise fall back to zone label
-                    fig_weekly.add_trace(go.Bar(
-                        x=weekly_pivot.index,
-                        y=weekly_pivot[zone],
-                        name=power_range,
-                        marker_color=colors[i % len(colors)],
-                        hovertemplate="<b>Week Starting:</b> %{x}<br>" +
-                                    f"<b>Power Zone:</b> {power_range}<br>" +
-                                    "<b>Time:</b> %{y:.2f} minutes<br>" +
-                                    "<extra></extra>"
-                    ))
-                
-                fig_weekly.update_layout(
-                    # title=f'Weekly Power Zone Distribution for {selected_athlete}',
-                    xaxis_title='Week Starting (Monday)',
-                    yaxis_title='Time (minutes)',
-                    barmode='stack',
-                    xaxis={'tickangle': 45}
-                )
-                
+        with col1:
+            weeks = st.slider("Select number of past weeks", min_value=4, max_value=52, value=12, step=1,
+                              help="Sets the initial view - drag the range slider under a chart to scrub through the year"
+                              if CHART_WINDOW_MODE == 'client' else None)
+        
+        # Weeks of history each athlete chart carries
+        chart_weeks = MAX_WEEKS if CHART_WINDOW_MODE == 'client' else weeks
+        
+        # Every series and zone matrix the tabs chart, computed once per (athlete, weeks, data version);
+        # only looked up when a chart isn't in the figure cache yet
+        @functools.cache
+        def get_summary():
+            if not selected_athlete or training.empty:
+                return None
+            weekly_summary = get_athlete_weekly_summary(training, selected_athlete, data_window_start, data_source, data_version)
+            state = load_synced_rolling_state(selected_athlete, metadata_version()) if data_source == 'local backup' else None
+            return get_athlete_summary(weekly_summary, selected_athlete, chart_weeks, current_week_start, data_version, state)
+        
+        def athlete_figure(metric, build):
+            """The selected athlete's chart from the figure cache, built from their summary on a miss"""
+            def build_windowed():
+                fig = build(get_summary())
+                if fig is not None and CHART_WINDOW_MODE == 'client':
+                    fig = dashboard_figures.with_client_window(fig, weeks, current_week_start)
+                return fig
+            
+            return get_figure(selected_athlete, weeks, metric, current_week_start, data_version, build_windowed)
+        
+        def render_training_time():
+            """TAB 1: Weekly Training Time"""
+            def build(summary):
+                if summary is not None and not summary.time.empty:
+                    return dashboard_figures.weekly_metric_figure(summary.time, 'HOURS', 'Weekly Hours', 'lightblue', 'Hours: %{y}<extra></extra>',
+                                                                 'hours', "Training Time (Hours)")
+            
+            fig = athlete_figure("Training Time", build)
+            if fig is not None:
+                st.subheader("Weekly Training Time with Rolling Averages")
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.warning("No power zone data available for the selected athlete and time period.")
+        
+        def render_tss():
+            """TAB 2: Weekly TSS"""
+            def build(summary):
+                if summary is not None and not summary.tss.empty:
+                    return dashboard_figures.weekly_metric_figure(summary.tss, 'TSS', 'Weekly TSS', 'lightcoral', 'TSS: %{y}<extra></extra>',
+                                                                 'TSS', "TSS")
+            
+            fig_tss = athlete_figure("TSS", build)
+            if fig_tss is not None:
+                st.subheader("Weekly TSS with Rolling Averages")
+                st.plotly_chart(fig_tss, use_container_width=True)
+            else:
+                st.warning("No workouts available for the selected athlete and time period.")
+        
+        def render_energy():
+            """TAB 3: Weekly Energy"""
+            def build(summary):
+                if summary is not None and not summary.energy.empty:
+                    return dashboard_figures.weekly_metric_figure(summary.energy, 'ENERGY_KJ', 'Weekly Energy (kJ)', 'lightgreen', 'Energy: %{y} kJ<extra></extra>',
+                                                                 'kJ', "Energy (kJ)")
+            
+            fig_energy = athlete_figure("Energy (kJ)", build)
+            if fig_energy is not None:
+                st.subheader("Weekly Energy (kJ) with Rolling Averages")
+                st.plotly_chart(fig_energy, use_container_width=True)
+            else:
+                st.warning("No workouts available for the selected athlete and time period.")
+        
+        def render_power_zones():
+            """TAB 4: Power Zone Distribution (Raw)"""
+            st.subheader("Power Zone Distribution")
+            
+            def build(summary):
+                if summary is not None and not summary.zone_minutes.empty:
+                    if ZONE_CHART_MODE == 'compact':
+                        # Minutes and percentages from one payload, switched in the browser
+                        return dashboard_figures.compact_zone_figure(summary.zone_minutes, summary.zone_names)
+                    return dashboard_figures.zone_figure(summary.zone_minutes, summary.zone_names, 'Time (minutes)',
+                                                        "<b>Time:</b> %{y:.2f} minutes<br>")
+            
+            fig_weekly = athlete_figure("Power Zones", build)
+            if fig_weekly is not None:
                 st.plotly_chart(fig_weekly, use_container_width=True)
-    
-    # TAB 5: Power Zone Distribution (Percentage)
-    with tab5:
-        st.subheader("Power Zone Distribution (%)")
         
-        if not df_athlete_data_zones_restrict.empty and 'POWER_ZONE_LABEL' in df_athlete_data_zones_restrict.columns and 'POWER_ZONE_SECONDS' in df_athlete_data_zones_restrict.columns:
-            # Convert seconds to minutes for better readability
-            df_zones_copy = df_athlete_data_zones_restrict.copy()
-            df_zones_copy['Power Zone Minutes'] = (df_zones_copy['POWER_ZONE_SECONDS'] / 60).round(2)
+        def render_power_zones_percent():
+            """TAB 5: Power Zone Distribution (Percentage)"""
+            st.subheader("Power Zone Distribution (%)")
             
-            # Show weekly breakdown using START_TIME column
-            if 'START_TIME' in df_athlete_data_zones_restrict.columns:
-                # Calculate week start date (Monday) for each date using WEEKS_PAST
-                df_zones_copy['Week_Start'] = df_zones_copy['WEEKS_PAST'].apply(
-                    lambda weeks_back: current_week_start - pd.Timedelta(weeks=weeks_back)
-                )
-                
-                # Group by week start and power zone
-                weekly_zones = df_zones_copy.groupby(['Week_Start', 'POWER_ZONE_LABEL'])['Power Zone Minutes'].sum().reset_index()
-                weekly_zones['Power Zone Minutes'] = weekly_zones['Power Zone Minutes'].round(2)
-                
-                # Create mapping from Power Zone Label to power ranges (without decimal points)
-                zone_mapping = df_zones_copy.groupby('POWER_ZONE_LABEL').agg({
-                    'POWER_ZONE_MINIMUM': 'first',
-                    'POWER_ZONE_MAXIMUM': 'first'
-                }).reset_index()
-                
-                # Filter out zones with invalid power ranges
-                valid_zones = zone_mapping[zone_mapping['POWER_ZONE_MINIMUM'].notna() & zone_mapping['POWER_ZONE_MAXIMUM'].notna()]['POWER_ZONE_LABEL'].tolist()
-                weekly_zones = weekly_zones[weekly_zones['POWER_ZONE_LABEL'].isin(valid_zones)]
-                zone_mapping = zone_mapping[zone_mapping['POWER_ZONE_LABEL'].isin(valid_zones)]
-                
-                # Handle NaN values before converting to int
-                zone_mapping['Power Range'] = zone_mapping.apply(
-                    lambda row: f"{int(row['POWER_ZONE_MINIMUM'])}-{int(row['POWER_ZONE_MAXIMUM'])}W" 
-                    if pd.notna(row['POWER_ZONE_MINIMUM']) and pd.notna(row['POWER_ZONE_MAXIMUM']) 
-                    else row['POWER_ZONE_LABEL'], 
-                    axis=1
-                )
-                zone_map_dict = dict(zip(zone_mapping['POWER_ZONE_LABEL'], zone_mapping['Power Range']))
-                
-                # Pivot to get zones as columns
-                weekly_pivot = weekly_zones.pivot(index='Week_Start', columns='POWER_ZONE_LABEL', values='Power Zone Minutes').fillna(0)
-                
-                # Sort columns by Power Zone Minimum to get lowest zones at bottom (filter out NaN values first)
-                zone_mapping_valid = zone_mapping[zone_mapping['POWER_ZONE_MINIMUM'].notna()]
-                zone_order = zone_mapping_valid.sort_values('POWER_ZONE_MINIMUM')['POWER_ZONE_LABEL'].tolist()
-                weekly_pivot = weekly_pivot.reindex(columns=[col for col in zone_order if col in weekly_pivot.columns])
-                
-                # Create normalized percentage chart
-         
-                
-                # Calculate weekly totals for normalization
-                weekly_totals = weekly_pivot.sum(axis=1)
-                weekly_percentage = weekly_pivot.div(weekly_totals, axis=0) * 100
-                
-                # Create percentage stacked bar chart
-                fig_percentage = go.Figure()
-                
-                for i, zone in enumerate(weekly_percentage.columns):
-                    # Get corresponding absolute values for tooltip
-                    absolute_values = weekly_pivot[zone]
-                    power_range = zone_map_dict.get(zone, zone)  # Use power range if available, otherwise fall back to zone label
-                    
-                    fig_percentage.add_trace(go.Bar(
-                        x=weekly_percentage.index,
-                        y=weekly_percentage[zone],
-                        name=power_range,
-                        marker_color=colors[i % len(colors)],
-                        customdata=absolute_values,
-                        hovertemplate="<b>Week Starting:</b> %{x}<br>" +
-                                    f"<b>Power Zone:</b> {power_range}<br>" +
-                                    "<b>Percentage:</b> %{y:.1f}%<br>" +
-                                    "<b>Total Time:</b> %{customdata:.2f} minutes<br>" +
-                                    "<extra></extra>"
-                    ))
-                
-                fig_percentage.update_layout(
-                    # title=f'Weekly Power Zone Distribution (%) for {selected_athlete}',
-                    xaxis_title='Week Starting (Monday)',
-                    yaxis_title='Percentage (%)',
-                    barmode='stack',
-                    xaxis={'tickangle': 45}
-                )
-                
+            def build(summary):
+                if summary is not None and not summary.zone_percent.empty:
+                    return dashboard_figures.zone_figure(summary.zone_percent, summary.zone_names, 'Percentage (%)',
+                                                        "<b>Percentage:</b> %{y:.1f}%<br>", minutes=summary.zone_minutes)
+            
+            fig_percentage = athlete_figure("Power Zones %", build)
+            if fig_percentage is not None:
                 st.plotly_chart(fig_percentage, use_container_width=True)
             else:
-                st.write("Missing required columns: 'POWER_ZONE_LABEL' and/or 'POWER_ZONE_SECONDS'")
-                st.write("Available columns:", df_athlete_data_zones_restrict.columns.tolist())
+                st.write("No power zone data available for the selected athlete.")
+        
+        def render_squad():
+            """TAB 6: Squad comparison"""
+            st.subheader(f"Squad Comparison (last {weeks} weeks)")
+            
+            # All athletes aggregated together, once per (weeks, current week, synced data version)
+            started = time.perf_counter()
+            squad_version = metadata_version()
+            squad = get_squad_summary(data_window_start, weeks, current_week_start, squad_version)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            
+            if squad.metrics.empty:
+                st.write("No synced training data available for the squad.")
+            else:
+                squad_metric = st.radio("Metric", list(dashboard_figures.SQUAD_METRICS) + ['Power Zones %'], horizontal=True)
+                fig_squad = get_figure(None, weeks, f"Squad {squad_metric}", current_week_start, squad_version,
+                                       lambda: dashboard_figures.squad_figure(squad, squad_metric, SQUAD_FACET_COLUMNS))
+                st.plotly_chart(fig_squad, use_container_width=True)
+                
+                athletes = squad.metrics['USER_NAME_FIXED'].nunique()
+                st.caption(f"{athletes} athletes ready in {elapsed_ms:.0f} ms")
+                if elapsed_ms > SQUAD_LATENCY_BUDGET_MS:
+                    st.warning(f"⚠️ Squad summary took longer than the {SQUAD_LATENCY_BUDGET_MS} ms budget")
+        
+        # Tab name -> function that draws it
+        VIEWS = {
+            "Training Time": render_training_time,
+            "TSS": render_tss,
+            "Energy (kJ)": render_energy,
+            "Power Zones": render_power_zones,
+            "Power Zones %": render_power_zones_percent,
+            "Squad": render_squad,
+        }
+        if ZONE_CHART_MODE == 'compact':
+            # The Power Zones chart has its own % switch
+            del VIEWS["Power Zones %"]
+        
+        if DASHBOARD_VIEW_MODE == 'tabs':
+            # Create tabs for different chart types - every tab is built and sent on each rerun
+            for tab, render in zip(st.tabs(list(VIEWS)), VIEWS.values()):
+                with tab:
+                    render()
+        else:
+            # Only the selected view's figure (and, for the squad, its aggregation) is built and sent
+            view = st.radio("View", list(VIEWS), horizontal=True, label_visibility="collapsed", key="view")
+            VIEWS[view]()
+        
+        raw_data_explorer(training, selected_athlete, data_version, today, current_week_start, weeks)
+    
+    # UI Components
+    @st.fragment
+    def athlete_dashboard():
+        """
+        Athlete picker and data loading. Picking another
+        athlete reruns this fragment (and the charts inside it) without
+        going back through login.
+        """
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Get the athletes without loading anyone's training data
+            available_athletes = load_athlete_list()
+            if available_athletes:
+                selected_athlete = st.selectbox("Select athlete", options=available_athletes)
+            else:
+                st.error("No athlete data available. Please check the data file.")
+                selected_athlete = None
+        
+        # Define the start of the current week (Monday of this week)
+        today = week_index.get_today(DASHBOARD_TIMEZONE)
+        current_week_start = week_index.current_week_start(today)
+        
+        # Load data - fixed to the widest window so moving the slider doesn't re-query
+        data_window_start = current_week_start - pd.Timedelta(weeks=MAX_WEEKS + max(athlete_summary.SEASON_WEEKS, ROLLING_LOOKBACK_WEEKS))
+        if selected_athlete and DATA_CACHE_MODE == 'swr':
+            snapshot = get_training_data_cache().get((selected_athlete, data_window_start))
+            training = snapshot.data if snapshot.data is not None else data_store.split_workouts(pd.DataFrame())
+            data_source, data_version = snapshot.source, snapshot.version
+            if snapshot.error is not None:
+                if isinstance(snapshot.error, snowflake.connector.errors.DatabaseError):
+                    show_snowflake_error(str(snapshot.error))
+                else:
+                    st.warning(f"⚠️ Latest data refresh failed: {snapshot.error}")
+            if snapshot.loaded_at:
+                st.caption(f"Data from {snapshot.source} | loaded {datetime.fromtimestamp(snapshot.loaded_at):%Y-%m-%d %H:%M}")
+        elif selected_athlete:
+            training = load_training_data(selected_athlete, data_window_start)
+            data_source, data_version = None, metadata_version()
         else:
-            st.write("No power zone data available for the selected athlete.")
\ No newline at end of file
+            training = data_store.split_workouts(pd.DataFrame())
+            data_source, data_version = None, None
+        
+        # One row per workout, and one row per workout per power zone
+        df_workouts, df_zone_seconds = training
+        # Sizing the frames copies them, so it only runs when asked for
+        if not training.empty and st.toggle("Show data memory usage", key="memory_on"):
+            workouts_report, zones_report = get_memory_report(training, selected_athlete, data_window_start, data_version)
+            st.dataframe(workouts_report)
+            st.dataframe(zones_report)
+        if selected_athlete and df_zone_seconds.empty and not training.empty:
+            st.warning("No power zone data available for the selected athlete.")
+        
+        weekly_charts(selected_athlete, training, data_source, data_version,
+                      today, current_week_start, data_window_start)
+    
+    athlete_dashboard()
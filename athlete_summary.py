@@ -0,0 +1,122 @@
+"""
+Everything the dashboard tabs chart for one athlete, built in a single pass
+from the weekly totals and zone seconds (data_store.WeeklySummary)
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import rolling_metrics
+import week_index
+
+# time / tss / energy: one row per displayed week (WEEKS_PAST 1..weeks with data)
+# with WEEK_START_DATE, the weekly value and its rolling averages, and each of
+# those for the same week last season as '<column>_LAST_SEASON'.
+# zone_minutes / zone_percent: week x zone matrices, columns ordered lowest zone
+# first; zone_names maps each zone label to its power range ("150-200W").
+AthleteWeeklySummary = namedtuple('AthleteWeeklySummary', [
+    'time', 'tss', 'energy', 'zone_minutes', 'zone_percent', 'zone_names',
+])
+
+# Weeks between a week and the same week last season
+SEASON_WEEKS = 52
+
+
+def _stored_averages(weekly, value, state, this_week_start):
+    """
+    weekly's values with their rolling averages read from the stored rolling
+    state, or None if the state doesn't hold exactly these weekly values (no
+    sync has written it, or it belongs to other data) and they must be computed
+    """
+    if state is None:
+        return None
+    state = state[state['METRIC'] == value]
+    series = weekly[['WEEKS_PAST', value]].sort_values('WEEKS_PAST', ignore_index=True)
+    stored = state.set_index(week_index.weeks_past(state['WEEK_START'], this_week_start)).reindex(series['WEEKS_PAST'])
+    if not np.array_equal(stored['VALUE'].to_numpy(dtype='float64'), series[value].to_numpy(dtype='float64')):
+        return None
+    return series.assign(**{name: stored[name].to_numpy() for name in rolling_metrics.ROLLING_KERNELS})
+
+
+def _metric_series(weekly, value, decimals, this_week_start, weeks, state=None):
+    """
+    Rolling averages over every week in the data window (from the rolling
+    state when it matches), trimmed to the displayed weeks, with last
+    season's values looked up by week number
+    """
+    series = _stored_averages(weekly, value, state, this_week_start)
+    if series is None:
+        series = rolling_metrics.rolling_averages(weekly[['WEEKS_PAST', value]], value)
+    series = series.round({name: decimals for name in rolling_metrics.ROLLING_KERNELS})
+    by_week = series.set_index('WEEKS_PAST')
+    series = series[series['WEEKS_PAST'].between(1, weeks)].reset_index(drop=True)
+    series.insert(1, 'WEEK_START_DATE', week_index.week_start_for(series['WEEKS_PAST'], this_week_start))
+
+    # Same week last season: a reindex on the week number, so weeks without data
+    # last season stay empty instead of shifting the rest out of line
+    last_season = by_week.reindex(series['WEEKS_PAST'] + SEASON_WEEKS)
+    for column in [value] + list(rolling_metrics.ROLLING_KERNELS):
+        series[f'{column}_LAST_SEASON'] = last_season[column].to_numpy()
+    return series
+
+
+def _zone_matrices(zones):
+    """Weekly minutes per zone, the same as percentages, and the zones' power ranges"""
+    if zones.empty:
+        return pd.DataFrame(), pd.DataFrame(), {}
+    minutes = zones.assign(MINUTES=(zones['POWER_ZONE_SECONDS'] / 60).round(2))
+
+    # Latest week first so 'first' picks the most recent power range
+    zone_mapping = minutes.sort_values('WEEK_START', ascending=False, kind='stable').groupby('POWER_ZONE_LABEL', observed=True).agg({
+        'POWER_ZONE_MINIMUM': 'first',
+        'POWER_ZONE_MAXIMUM': 'first'
+    }).reset_index()
+    # Zones without a valid power range are left out
+    zone_mapping = zone_mapping[zone_mapping['POWER_ZONE_MINIMUM'].notna() & zone_mapping['POWER_ZONE_MAXIMUM'].notna()]
+    zone_mapping = zone_mapping.sort_values('POWER_ZONE_MINIMUM')
+    zone_names = {
+        label: f"{int(low)}-{int(high)}W"
+        for label, low, high in zip(zone_mapping['POWER_ZONE_LABEL'], zone_mapping['POWER_ZONE_MINIMUM'], zone_mapping['POWER_ZONE_MAXIMUM'])
+    }
+
+    zone_minutes = minutes.pivot_table(index='WEEK_START', columns='POWER_ZONE_LABEL', values='MINUTES',
+                                       aggfunc='sum', fill_value=0, observed=True).round(2)
+    zone_minutes = zone_minutes.reindex(columns=[label for label in zone_names if label in zone_minutes.columns])
+    zone_minutes.index.name = 'Week_Start'
+    zone_percent = zone_minutes.div(zone_minutes.sum(axis=1), axis=0) * 100
+    return zone_minutes, zone_percent, zone_names
+
+
+def summary_is_empty(summary):
+    """True if none of the displayed weeks has anything to chart"""
+    return all(part.empty for part in (summary.time, summary.tss, summary.energy, summary.zone_minutes))
+
+
+def build_athlete_summary(weekly, this_week_start, weeks, state=None):
+    """
+    Turn one athlete's weekly summary into the series and matrices every tab
+    renders. weeks is the number of past weeks shown (the current week is left out).
+    state is the athlete's stored rolling state (rolling_state.load_rolling_state),
+    whose averages are used instead of recomputed wherever it matches weekly.
+    """
+    totals = weekly.totals.assign(WEEKS_PAST=week_index.weeks_past(weekly.totals['WEEK_START'], this_week_start))
+    zones = weekly.zones.assign(WEEKS_PAST=week_index.weeks_past(weekly.zones['WEEK_START'], this_week_start))
+
+    # Time in zones per week, then TSS and energy per week (each workout counted once)
+    weekly_time = zones.groupby('WEEKS_PAST', as_index=False)['POWER_ZONE_SECONDS'].sum()
+    weekly_time['HOURS'] = (weekly_time['POWER_ZONE_SECONDS'] / 3600).round(2)
+    weekly_totals = totals.groupby('WEEKS_PAST', as_index=False)[['TSS', 'ENERGY']].sum()
+    weekly_totals['TSS'] = weekly_totals['TSS'].round(1)
+    weekly_totals['ENERGY_KJ'] = (weekly_totals['ENERGY'] / 1000).round(1)
+
+    zone_minutes, zone_percent, zone_names = _zone_matrices(zones[zones['WEEKS_PAST'].between(1, weeks)])
+    return AthleteWeeklySummary(
+        time=_metric_series(weekly_time, 'HOURS', 2, this_week_start, weeks, state),
+        tss=_metric_series(weekly_totals, 'TSS', 1, this_week_start, weeks, state),
+        energy=_metric_series(weekly_totals, 'ENERGY_KJ', 1, this_week_start, weeks, state),
+        zone_minutes=zone_minutes,
+        zone_percent=zone_percent,
+        zone_names=zone_names,
+    )
@@ -0,0 +1,116 @@
+"""
+Payload-size benchmark for the power zone charts
+Builds one synthetic athlete's summary and prints the bytes each zone chart
+rendering sends to the browser: the Power Zones and Power Zones % figures
+("separate") against the single chart with a Minutes / % switch ("compact").
+Also times what a rerun still pays for a chart from the figure cache:
+st.plotly_chart copies the cached figure to a dict and serialises it each time.
+"""
+import sys
+import time
+
+import pandas as pd
+import plotly.io as pio
+import plotly.tools
+
+import athlete_summary
+import check_memory
+import dashboard_figures
+import data_store
+import week_index
+
+WEEKS = [12, 52]
+
+# A cached chart's render must cost at most this share of building it
+MAX_RENDER_SHARE = 0.25
+
+
+def payload_bytes(*figures):
+    """Bytes of the JSON st.plotly_chart sends for the figures"""
+    return sum(len(pio.to_json(fig, validate=False).encode()) for fig in figures)
+
+
+def zone_payloads(summary):
+    """(separate, compact) payload bytes for one athlete summary"""
+    separate = payload_bytes(
+        dashboard_figures.zone_figure(summary.zone_minutes, summary.zone_names, 'Time (minutes)',
+                                      "<b>Time:</b> %{y:.2f} minutes<br>"),
+        dashboard_figures.zone_figure(summary.zone_percent, summary.zone_names, 'Percentage (%)',
+                                      "<b>Percentage:</b> %{y:.1f}%<br>", minutes=summary.zone_minutes),
+    )
+    compact = payload_bytes(dashboard_figures.compact_zone_figure(summary.zone_minutes, summary.zone_names))
+    return separate, compact
+
+
+def athlete_figures(summary, this_week_start, weeks):
+    """The four athlete charts as the app builds them (compact zone chart, client-side window)"""
+    figures = [
+        dashboard_figures.weekly_metric_figure(summary.time, 'HOURS', 'Weekly Hours', 'lightblue',
+                                               'Hours: %{y}<extra></extra>', 'hours', "Training Time (Hours)"),
+        dashboard_figures.weekly_metric_figure(summary.tss, 'TSS', 'Weekly TSS', 'lightcoral',
+                                               'TSS: %{y}<extra></extra>', 'TSS', "TSS"),
+        dashboard_figures.weekly_metric_figure(summary.energy, 'ENERGY_KJ', 'Weekly Energy (kJ)', 'lightgreen',
+                                               'Energy: %{y} kJ<extra></extra>', 'kJ', "Energy (kJ)"),
+        dashboard_figures.compact_zone_figure(summary.zone_minutes, summary.zone_names),
+    ]
+    return [dashboard_figures.with_client_window(fig, weeks, this_week_start) for fig in figures]
+
+
+def render_spec(fig):
+    """The JSON st.plotly_chart sends for a figure, produced the way it does"""
+    return pio.to_json(plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True), validate=False)
+
+
+def mean_ms(func, repeat=10):
+    """Average wall time of func() in milliseconds, after one warm-up call"""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def render_costs(weekly, this_week_start, weeks=max(WEEKS)):
+    """Print the cost of building the athlete charts against rendering them from the figure cache, returning True if within budget"""
+    def build():
+        summary = athlete_summary.build_athlete_summary(weekly, this_week_start, weeks)
+        return athlete_figures(summary, this_week_start, 12)
+
+    figures = build()
+    build_ms = mean_ms(build, repeat=3)
+    render_ms = mean_ms(lambda: [render_spec(fig) for fig in figures])
+    payload = sum(len(render_spec(fig).encode()) for fig in figures)
+    print(f"🔍 {len(figures)} athlete charts ({weeks} weeks, {payload / 1024:.1f} KB): "
+          f"built in {build_ms:.0f} ms, rendered from the cache in {render_ms:.1f} ms "
+          f"({render_ms / build_ms:.0%} of building)")
+    if render_ms > MAX_RENDER_SHARE * build_ms:
+        print(f"❌ Rendering a cached chart costs more than {MAX_RENDER_SHARE:.0%} of building it")
+        return False
+    print("✅ Cached charts render at a fraction of their build cost")
+    return True
+
+
+def benchmark_payload():
+    """Print the payload sizes and render costs, returning True if the compact chart is smaller at every window and cached charts render cheaply"""
+    print("Building synthetic athlete...")
+    squad = check_memory.make_squad()
+    athlete = squad['USER_NAME_FIXED'].iloc[0]
+    training = data_store.split_workouts(squad[squad['USER_NAME_FIXED'] == athlete])
+    weekly = data_store.build_weekly_summary(training)
+    this_week_start = week_index.current_week_start()
+
+    ok = True
+    for weeks in WEEKS:
+        summary = athlete_summary.build_athlete_summary(weekly, this_week_start, weeks)
+        separate, compact = zone_payloads(summary)
+        print(f"📊 {weeks} weeks, {summary.zone_minutes.shape[1]} zones: "
+              f"separate {separate / 1024:.1f} KB, compact {compact / 1024:.1f} KB "
+              f"({1 - compact / separate:.0%} smaller)")
+        ok = ok and compact < separate
+    print("✅ Compact zone chart is smaller" if ok else "❌ Compact zone chart is not smaller")
+    return render_costs(weekly, this_week_start) and ok
+
+
+if __name__ == "__main__":
+    pd.set_option('mode.copy_on_write', True)
+    sys.exit(0 if benchmark_payload() else 1)
@@ -0,0 +1,139 @@
+"""
+Memory regression check for the dashboard's athlete pipeline
+Builds a synthetic squad, writes it to a temporary Parquet store, loads one
+athlete's slice as the page does and measures the peak Python allocation of:
+  - the work the page does once per athlete and data version (the weekly
+    summary and the explorer's joined zone rows, both cached afterwards)
+  - a rerun on top of those caches (a new weeks value and a page of the
+    recent-weeks explorer table)
+Each must stay within a multiple of the athlete's slice plus a fixed overhead
+allowance; a rerun that starts copying the slice fails.
+"""
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import athlete_summary
+import data_explorer
+import data_store
+import week_index
+
+pd.set_option('mode.copy_on_write', True)
+
+ATHLETES = 5
+YEARS = 3
+# Far more than a real athlete trains, so the selected slice (a few MB) dwarfs
+# the fixed overhead of a rerun and any copy of it stands out
+WORKOUTS_PER_WEEK = 100
+ZONES = 6
+
+MAX_WEEKS = 52
+RERUN_WEEKS = 12
+
+# Peak allocation allowed per path: this many times the athlete's slice plus
+# OVERHEAD_BYTES for the small per-week frames, which don't grow with the slice.
+# The once-per-version work builds the weekly summary and the explorer's joined,
+# sorted zone rows; a rerun only reads the cached results.
+MAX_LOAD_SLICE_MULTIPLE = 4.0
+MAX_RERUN_SLICE_MULTIPLE = 0.5
+OVERHEAD_BYTES = 1_000_000
+
+
+def make_squad(seed=0):
+    """One row per workout per power zone, the same shape as the Snowflake view"""
+    rng = np.random.default_rng(seed)
+    workouts = ATHLETES * YEARS * 52 * WORKOUTS_PER_WEEK
+    start = pd.Timestamp.now().normalize() - pd.Timedelta(days=YEARS * 365)
+    start_times = start + pd.to_timedelta(rng.integers(0, YEARS * 365 * 86400, workouts), unit='s')
+    athletes = np.repeat([f'Athlete {i:02d}' for i in range(ATHLETES)], workouts // ATHLETES)
+
+    df = pd.DataFrame({
+        'USER_NAME_FIXED': np.repeat(athletes, ZONES),
+        'WORKOUT_TYPE': 'Bike',
+        'START_TIME': np.repeat(start_times, ZONES),
+        'POWER_ZONE_LABEL': np.tile([f'Z{z + 1}' for z in range(ZONES)], workouts),
+        'POWER_ZONE_MINIMUM': np.tile(np.arange(ZONES) * 50.0, workouts),
+        'POWER_ZONE_MAXIMUM': np.tile(np.arange(1, ZONES + 1) * 50.0, workouts),
+        'POWER_ZONE_SECONDS': rng.integers(0, 1800, workouts * ZONES).astype('float64'),
+        'TSS': np.repeat(rng.integers(20, 250, workouts).astype('float64'), ZONES),
+        'ENERGY': np.repeat(rng.integers(200_000, 3_000_000, workouts).astype('float64'), ZONES),
+    })
+    return data_store.apply_schema(df)
+
+
+def frame_bytes(*frames):
+    """Deep memory of one or more DataFrames"""
+    return int(sum(frame.memory_usage(index=True, deep=True).sum() for frame in frames))
+
+
+def load_once(training, this_week_start):
+    """What the page builds and caches once per athlete and data version (live data)"""
+    weekly = data_store.build_weekly_summary(training)
+    rows = data_store.athlete_zone_rows(training, this_week_start)
+    return weekly, rows
+
+
+def rerun(weekly, rows, this_week_start, weeks):
+    """A rerun on warm caches: the summary for a new weeks value and one explorer page"""
+    summary = athlete_summary.build_athlete_summary(weekly, this_week_start, weeks)
+    recent = data_store.slice_recent_weeks(rows, this_week_start, weeks)
+    page = data_explorer.get_page(recent, 1, 50)
+    return summary, recent, page
+
+
+def peak_bytes(func, *args):
+    """Result of func(*args) and its peak traced allocation"""
+    tracemalloc.start()
+    result = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def within_budget(label, peak, slice_bytes, multiple):
+    """Report a path's peak against its budget, returning True if it fits"""
+    budget = multiple * slice_bytes + OVERHEAD_BYTES
+    print(f"🔍 {label}: peak {peak / 1e6:.2f} MB ({peak / slice_bytes:.2f}x the slice), budget {budget / 1e6:.2f} MB")
+    if peak > budget:
+        print(f"❌ {label} allocates more than {multiple:g}x the athlete's slice plus {OVERHEAD_BYTES / 1e6:g} MB")
+        return False
+    return True
+
+
+def check_memory():
+    """Run the check, returning True if the pipeline stays within budget"""
+    print("Building synthetic squad...")
+    squad = make_squad()
+    print(f"📊 {len(squad)} rows, {frame_bytes(squad) / 1e6:.1f} MB for {ATHLETES} athletes")
+
+    this_week_start = week_index.current_week_start()
+    since = this_week_start - pd.Timedelta(weeks=MAX_WEEKS + athlete_summary.SEASON_WEEKS)
+    athlete = squad['USER_NAME_FIXED'].iloc[0]
+
+    with tempfile.TemporaryDirectory() as root:
+        data_store.save_batches([squad], root=root)
+        del squad
+        training = data_store.split_workouts(
+            data_store.load_local_data(athlete=athlete, columns=data_store.DASHBOARD_COLUMNS, since=since, root=root)
+        )
+    slice_bytes = frame_bytes(*training)
+    print(f"📁 Selected athlete: {len(training.workouts)} workouts, {slice_bytes / 1e6:.2f} MB cached")
+
+    (weekly, rows), load_peak = peak_bytes(load_once, training, this_week_start)
+    (summary, recent, page), rerun_peak = peak_bytes(rerun, weekly, rows, this_week_start, RERUN_WEEKS)
+
+    ok = within_budget("Once per data version", load_peak, slice_bytes, MAX_LOAD_SLICE_MULTIPLE)
+    ok = within_budget("Rerun", rerun_peak, slice_bytes, MAX_RERUN_SLICE_MULTIPLE) and ok
+    if not np.shares_memory(recent['POWER_ZONE_SECONDS'].to_numpy(), rows['POWER_ZONE_SECONDS'].to_numpy()):
+        print("❌ The recent-weeks filter copied the athlete's rows instead of slicing them")
+        ok = False
+    if ok:
+        print("✅ Memory use is within budget")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_memory() else 1)
@@ -0,0 +1,207 @@
+"""
+Plotly figures for the dashboard charts, built from athlete_summary and
+squad_summary results so the app and offline tools draw the same charts
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+ZONE_COLORS = ["#485E89", "#4B8C67", "#24755B", '#B0D581', '#46BFB7', '#D2F2F9', '#9DE2F1', "#15C7EF"]
+
+# Squad tab metric -> (summary column, bar colour), matching the athlete tabs
+SQUAD_METRICS = {
+    'Training Time (Hours)': ('HOURS', 'lightblue'),
+    'TSS': ('TSS', 'lightcoral'),
+    'Energy (kJ)': ('ENERGY_KJ', 'lightgreen'),
+}
+
+# Hover text of the compact zone chart, one per view; each is sent once per
+# figure rather than once per zone trace
+ZONE_HOVER = {
+    'minutes': ("<b>Week Starting:</b> %{x|%Y-%m-%d}<br><b>Power Zone:</b> %{fullData.name}<br>"
+                "<b>Time:</b> %{y:.2f} minutes<extra></extra>"),
+    'percent': ("<b>Week Starting:</b> %{x|%Y-%m-%d}<br><b>Power Zone:</b> %{fullData.name}<br>"
+                "<b>Percentage:</b> %{y:.1f}%<extra></extra>"),
+}
+
+WEEK_MS = 7 * 24 * 3600 * 1000
+
+
+def with_client_window(fig, weeks, this_week_start):
+    """Range slider and selector on a weekly chart's x-axis, opened on the last `weeks` weeks"""
+    # Weekly bars are centred on their Monday, so the view runs half a week either side
+    half_week = pd.Timedelta(days=3.5)
+    fig.update_xaxes(
+        range=[(this_week_start - pd.Timedelta(weeks=weeks) - half_week).isoformat(), (this_week_start - half_week).isoformat()],
+        rangeslider=dict(visible=True, thickness=0.08),
+        rangeselector=dict(buttons=[
+            dict(count=28, label="4w", step="day", stepmode="backward"),
+            dict(count=84, label="12w", step="day", stepmode="backward"),
+            dict(count=182, label="26w", step="day", stepmode="backward"),
+            dict(step="all", label="All"),
+        ]),
+    )
+    return fig
+
+
+def weekly_metric_figure(series, value, bar_name, bar_color, bar_hover, unit, yaxis_title):
+    """Weekly bars with the 4-week, 8-week weighted and 8-week log averages over them"""
+    fig = go.Figure()
+
+    # Add bar chart for the weekly values
+    fig.add_trace(go.Bar(
+        x=series['WEEK_START_DATE'],
+        y=series[value],
+        name=bar_name,
+        marker_color=bar_color,
+        hovertemplate=bar_hover
+    ))
+
+    # Rolling average lines
+    averages = [
+        ('ROLLING_4WK_AVG', '4-Week Rolling Average', '4-Week Avg', 'red'),
+        ('ROLLING_8WK_WEIGHTED_AVG', '8-Week Weighted Average', '8-Week Weighted Avg', 'green'),
+        ('ROLLING_8WK_LOG_AVG', '8-Week Log Average', '8-Week Log Avg', 'purple'),
+    ]
+    for column, name, label, color in averages:
+        fig.add_trace(go.Scatter(
+            x=series['WEEK_START_DATE'],
+            y=series[column],
+            mode='lines+markers',
+            name=name,
+            line=dict(color=color, width=3),
+            marker=dict(size=6),
+            hovertemplate=f'{label}: %{{y}} {unit}<extra></extra>'
+        ))
+
+    # Same weeks last season, dashed over this season's dates
+    if series[f'{value}_LAST_SEASON'].notna().any():
+        for column, name, label, color in averages:
+            fig.add_trace(go.Scatter(
+                x=series['WEEK_START_DATE'],
+                y=series[f'{column}_LAST_SEASON'],
+                mode='lines+markers',
+                name=f'{name} (Last Season)',
+                line=dict(color=color, width=2, dash='dash'),
+                marker=dict(size=4),
+                hovertemplate=f'{label} (Last Season): %{{y}} {unit}<extra></extra>'
+            ))
+
+    fig.update_layout(
+        # title=f'Last {weeks} weeks',
+        xaxis_title="Week Starting (Monday)",
+        yaxis_title=yaxis_title,
+        showlegend=True,
+        hovermode='x unified'
+    )
+
+    # Format x-axis to show dates nicely
+    fig.update_xaxes(tickformat="%Y-%m-%d")
+    return fig
+
+
+def zone_figure(values, zone_names, yaxis_title, value_hover, minutes=None):
+    """Stacked weekly bars per power zone, lowest zone at the bottom"""
+    fig = go.Figure()
+
+    for i, zone in enumerate(values.columns):
+        power_range = zone_names.get(zone, zone)  # Use power range if available, otherwise fall back to zone label
+        hovertemplate = ("<b>Week Starting:</b> %{x}<br>" +
+                         f"<b>Power Zone:</b> {power_range}<br>" +
+                         value_hover)
+        if minutes is not None:
+            # Absolute minutes alongside the percentage
+            hovertemplate += "<b>Total Time:</b> %{customdata:.2f} minutes<br>"
+        fig.add_trace(go.Bar(
+            x=values.index,
+            y=values[zone],
+            name=power_range,
+            marker_color=ZONE_COLORS[i % len(ZONE_COLORS)],
+            customdata=minutes[zone] if minutes is not None else None,
+            hovertemplate=hovertemplate + "<extra></extra>"
+        ))
+
+    fig.update_layout(
+        xaxis_title='Week Starting (Monday)',
+        yaxis_title=yaxis_title,
+        barmode='stack',
+        xaxis={'tickangle': 45}
+    )
+    return fig
+
+
+def compact_zone_figure(minutes, zone_names, percent=False):
+    """
+    Stacked weekly minutes per power zone with a Minutes / % switch. The %
+    view is Plotly's barnorm over the same minutes, so one payload serves both
+    views. Weeks are laid out with x0/dx instead of a date array per trace,
+    minutes are sent as float32 and the hover text sits once in the template.
+    """
+    # One row per week from the first to the last; weeks without data stay empty (NaN)
+    weeks = pd.date_range(minutes.index.min(), minutes.index.max(), freq='7D')
+    values = minutes.reindex(weeks).to_numpy(dtype='float32')
+    view = 'percent' if percent else 'minutes'
+
+    fig = go.Figure()
+    for i, zone in enumerate(minutes.columns):
+        fig.add_trace(go.Bar(
+            x0=weeks[0].isoformat(),
+            dx=WEEK_MS,
+            y=np.ascontiguousarray(values[:, i]),
+            name=zone_names.get(zone, zone),
+            marker_color=ZONE_COLORS[i % len(ZONE_COLORS)],
+        ))
+
+    # The active template (Streamlit's inside the app) with the hover text added to its bar defaults
+    template = go.layout.Template(pio.templates[pio.templates.default])
+    template.data.bar = [go.Bar(hovertemplate=ZONE_HOVER[view])]
+
+    titles = {'minutes': 'Time (minutes)', 'percent': 'Percentage (%)'}
+    fig.update_layout(
+        template=template,
+        xaxis_title='Week Starting (Monday)',
+        yaxis_title=titles[view],
+        barmode='stack',
+        barnorm='percent' if percent else '',
+        xaxis={'tickangle': 45, 'type': 'date'},
+        updatemenus=[dict(
+            type='buttons',
+            direction='right',
+            active=1 if percent else 0,
+            x=0, xanchor='left', y=1.12, yanchor='bottom',
+            buttons=[
+                dict(label='Minutes', method='update',
+                     args=[{'hovertemplate': ZONE_HOVER['minutes']}, {'barnorm': '', 'yaxis.title.text': titles['minutes']}]),
+                dict(label='%', method='update',
+                     args=[{'hovertemplate': ZONE_HOVER['percent']}, {'barnorm': 'percent', 'yaxis.title.text': titles['percent']}]),
+            ],
+        )],
+    )
+    return fig
+
+
+def squad_figure(squad, metric, columns=4):
+    """One small chart per athlete, sharing the y-axis so the squad can be compared at a glance"""
+    athletes = sorted(squad.metrics['USER_NAME_FIXED'].unique())
+    rows = -(-len(athletes) // columns)
+    common = dict(x='WEEK_START', facet_col='USER_NAME_FIXED', facet_col_wrap=columns,
+                  facet_row_spacing=min(0.08, 0.5 / max(rows, 1)), height=max(300, 220 * rows))
+    if metric == 'Power Zones %':
+        fig = px.bar(squad.zone_percent, y='POWER_ZONE_PERCENT', color='POWER_ZONE_LABEL',
+                     color_discrete_sequence=ZONE_COLORS,
+                     category_orders={'USER_NAME_FIXED': athletes, 'POWER_ZONE_LABEL': squad.zone_order},
+                     labels={'POWER_ZONE_PERCENT': '%', 'POWER_ZONE_LABEL': 'Zone'}, **common)
+        fig.update_traces(hovertemplate="<b>Week Starting:</b> %{x}<br><b>Percentage:</b> %{y:.1f}%<extra></extra>")
+        fig.update_layout(barmode='stack')
+    else:
+        column, color = SQUAD_METRICS[metric]
+        fig = px.bar(squad.metrics, y=column, color_discrete_sequence=[color], labels={column: metric},
+                     category_orders={'USER_NAME_FIXED': athletes}, **common)
+        fig.update_traces(hovertemplate=f"<b>Week Starting:</b> %{{x}}<br><b>{metric}:</b> %{{y}}<extra></extra>")
+    # Facet titles show just the athlete's name
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
+    fig.update_xaxes(tickformat="%Y-%m-%d", title=None)
+    return fig
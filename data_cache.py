@@ -0,0 +1,118 @@
+"""
+Stale-while-revalidate cache for the dashboard's training data
+Serves the last loaded snapshot straight away and refreshes it on a background
+thread, so page loads don't wait on a warehouse query
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# version goes up every time new data is swapped in, so anything derived from a
+# snapshot (aggregates, figures) can use it as part of its own cache key
+Snapshot = namedtuple('Snapshot', ['data', 'source', 'version', 'loaded_at', 'checked_at', 'token', 'error'])
+
+
+class StaleWhileRevalidateCache:
+    """
+    Keyed snapshots that are refreshed in the background once they go stale.
+
+    refresh(key) -> (data, source) is the slow load (e.g. Snowflake) and runs
+    on a background thread. initial(key) -> (data, source) is a fast load
+    (e.g. the local Parquet store) used the first time a key is requested.
+    data can be anything with an .empty attribute, e.g. a DataFrame.
+    version_token() returns something that changes when the underlying data
+    does (e.g. the metadata.json modification time); a change marks every
+    snapshot stale, so a completed sync is picked up on the next get() of
+    each key rather than after refresh_interval.
+    """
+
+    def __init__(self, refresh, initial=None, version_token=None, max_entries=8, refresh_interval=900):
+        self.refresh = refresh
+        self.initial = initial
+        self.version_token = version_token or (lambda: None)
+        self.max_entries = max_entries
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._in_flight = set()
+        self._version = 0
+
+    def get(self, key):
+        """
+        Return the current snapshot for key, scheduling a background refresh if
+        it is stale. Only blocks when there is nothing at all to serve yet.
+        """
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is not None:
+                self._entries.move_to_end(key)
+
+        if snapshot is None:
+            snapshot = self._load_initial(key)
+
+        if self._is_stale(snapshot):
+            self._refresh_in_background(key)
+        return snapshot
+
+    def _load_initial(self, key):
+        """First request for a key: fast local load, or a blocking refresh if that has nothing"""
+        token = self.version_token()
+        if self.initial is not None:
+            data, source = self.initial(key)
+            if data is not None and not data.empty:
+                # checked_at=0 makes it stale straight away, so live data follows in the background
+                return self._store(key, data, source, token, checked_at=0)
+        return self._run_refresh(key)
+
+    def _is_stale(self, snapshot):
+        """Stale once the refresh interval has passed or the data version token has changed"""
+        if time.time() - snapshot.checked_at > self.refresh_interval:
+            return True
+        return self.version_token() != snapshot.token
+
+    def _refresh_in_background(self, key):
+        """Start a refresh thread for key unless one is already running"""
+        with self._lock:
+            if key in self._in_flight:
+                return
+            self._in_flight.add(key)
+        thread = threading.Thread(target=self._run_refresh, args=(key,), daemon=True)
+        thread.start()
+
+    def _run_refresh(self, key):
+        """Reload key and swap the new snapshot in; on failure keep serving the old one"""
+        token = self.version_token()
+        try:
+            data, source = self.refresh(key)
+            return self._store(key, data, source, token)
+        except Exception as e:
+            with self._lock:
+                previous = self._entries.get(key)
+                if previous is None:
+                    previous = Snapshot(None, None, 0, 0, 0, None, None)
+                # Record the failure and back off until the next interval
+                snapshot = previous._replace(checked_at=time.time(), token=token, error=e)
+                self._entries[key] = snapshot
+                self._evict()
+            return snapshot
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def _store(self, key, data, source, token, checked_at=None):
+        """Atomically replace the snapshot for key"""
+        now = time.time()
+        with self._lock:
+            self._version += 1
+            snapshot = Snapshot(data, source, self._version, now, now if checked_at is None else checked_at, token, None)
+            self._entries[key] = snapshot
+            self._entries.move_to_end(key)
+            self._evict()
+        return snapshot
+
+    def _evict(self):
+        """Drop the least recently used keys beyond max_entries (lock must be held)"""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,29 @@
+"""
+Server-side filtering and paging for the raw data tables, so the browser only
+ever receives the page on screen
+"""
+
+import pandas as pd
+
+
+def filter_rows(df, column, text):
+    """Rows whose column contains text (case-insensitive)"""
+    values = df[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Match the (few) categories rather than every row's string form
+        categories = values.cat.categories
+        matches = categories[categories.astype(str).str.contains(text, case=False, regex=False)]
+        return df[values.isin(matches)]
+    return df[values.astype(str).str.contains(text, case=False, regex=False, na=False)]
+
+
+def page_count(rows, page_size):
+    """Number of pages needed for rows (at least 1, so an empty table still has a page)"""
+    return max(1, -(-rows // page_size))
+
+
+def get_page(df, page, page_size, columns=None):
+    """Rows of the 1-based page, limited to columns (a positional slice, not a copy)"""
+    page = min(max(1, page), page_count(len(df), page_size))
+    rows = df.iloc[(page - 1) * page_size:page * page_size]
+    return rows[columns] if columns is not None else rows
@@ -0,0 +1,663 @@
+"""
+Local training data store shared by the extraction scripts and the dashboard
+Training data is kept as a Parquet dataset partitioned by athlete and year
+(data/training_peaks/USER_NAME_FIXED=<name>/YEAR=<year>/part-0.parquet) next to
+data/metadata.json, and is kept up to date with incremental (watermark-based) syncs
+"""
+
+import os
+import json
+import shutil
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import week_index
+
+DATA_DIR = 'data'
+PARQUET_DIR = os.path.join(DATA_DIR, 'training_peaks')
+METADATA_PATH = os.path.join(DATA_DIR, 'metadata.json')
+
+# Pre-aggregated weekly tables written at sync time for the dashboard:
+# athlete x week workout totals and athlete x week x zone seconds
+WEEKLY_TOTALS_PATH = os.path.join(DATA_DIR, 'weekly_totals.parquet')
+WEEKLY_ZONES_PATH = os.path.join(DATA_DIR, 'weekly_zones.parquet')
+
+# Legacy single-file store, still read if the Parquet dataset hasn't been written yet
+CSV_PATH = os.path.join(DATA_DIR, 'training_peaks_data.csv')
+
+PARTITION_COLS = ['USER_NAME_FIXED', 'YEAR']
+PARQUET_COMPRESSION = 'zstd'
+
+# Columns the dashboard actually uses
+DASHBOARD_COLUMNS = [
+    'USER_NAME_FIXED', 'WORKOUT_TYPE', 'START_TIME', 'POWER_ZONE_LABEL',
+    'POWER_ZONE_MINIMUM', 'POWER_ZONE_MAXIMUM', 'POWER_ZONE_SECONDS', 'TSS', 'ENERGY',
+]
+
+# Declared dtypes for the training data. The labels repeat on every zone row
+# so they are categoricals; float32 is plenty for seconds, TSS, joules and watts
+# (and, unlike int32, keeps the gaps Snowflake returns as NULL)
+TRAINING_SCHEMA = {
+    'USER_NAME_FIXED': 'category',
+    'WORKOUT_TYPE': 'category',
+    'POWER_ZONE_LABEL': 'category',
+    'START_TIME': 'datetime64[ns]',
+    'POWER_ZONE_MINIMUM': 'float32',
+    'POWER_ZONE_MAXIMUM': 'float32',
+    'POWER_ZONE_SECONDS': 'float32',
+    'TSS': 'float32',
+    'ENERGY': 'float32',
+}
+
+# The view has one row per workout per power zone. A workout is identified by
+# these columns; TSS and ENERGY belong to the workout, not to each zone row
+WORKOUT_KEY = ['USER_NAME_FIXED', 'START_TIME', 'WORKOUT_TYPE']
+WORKOUT_MEASURES = ['TSS', 'ENERGY']
+ZONE_COLUMNS = ['POWER_ZONE_LABEL', 'POWER_ZONE_MINIMUM', 'POWER_ZONE_MAXIMUM', 'POWER_ZONE_SECONDS']
+
+
+class TrainingData(namedtuple('TrainingData', ['workouts', 'zones'])):
+    """Workout-level table plus zone-seconds table, joined on WORKOUT_ID"""
+    __slots__ = ()
+
+    @property
+    def empty(self):
+        return self.workouts.empty
+
+
+class WeeklySummary(namedtuple('WeeklySummary', ['totals', 'zones'])):
+    """Athlete x week workout totals plus athlete x week x zone seconds"""
+    __slots__ = ()
+
+    @property
+    def empty(self):
+        return self.totals.empty and self.zones.empty
+
+# Rows newer than (watermark - look-back) are re-fetched on every incremental
+# sync so that workouts edited or uploaded late in TrainingPeaks are picked up
+DEFAULT_LOOKBACK_DAYS = 14
+
+
+def load_metadata(path=METADATA_PATH):
+    """Load metadata.json, returning an empty dict if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_metadata(metadata, path=METADATA_PATH):
+    """Write metadata.json"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def _first_timestamp(*values):
+    """First of values that parses as a timestamp, or None"""
+    for value in values:
+        if value in (None, '', 'N/A'):
+            continue
+        timestamp = pd.to_datetime(value, errors='coerce')
+        if pd.notna(timestamp):
+            return timestamp
+    return None
+
+
+def get_watermark(metadata):
+    """
+    Latest START_TIME recorded by the previous sync, or None.
+    Capped at the time of that sync: the view holds future-dated (planned)
+    workouts, and a watermark past them would skip every workout done until then.
+    """
+    # Older metadata files written by the different extractors use different keys
+    watermark = _first_timestamp(
+        metadata.get('watermark'),
+        (metadata.get('date_range') or {}).get('latest'),
+        metadata.get('date_range_end'),
+    )
+    if watermark is None:
+        return None
+    synced_at = _first_timestamp(metadata.get('last_sync'), metadata.get('last_updated'))
+    return min(watermark, synced_at if synced_at is not None else pd.Timestamp.now())
+
+
+def get_lookback_days():
+    """Look-back window for late-arriving edits (SYNC_LOOKBACK_DAYS env var)"""
+    try:
+        return max(0, int(os.environ.get('SYNC_LOOKBACK_DAYS', DEFAULT_LOOKBACK_DAYS)))
+    except ValueError:
+        return DEFAULT_LOOKBACK_DAYS
+
+
+def full_refresh_requested(argv=None):
+    """True if a full re-pull was asked for via --full-refresh or SYNC_FULL_REFRESH"""
+    argv = argv if argv is not None else []
+    if '--full-refresh' in argv:
+        return True
+    return os.environ.get('SYNC_FULL_REFRESH', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def get_sync_start(metadata, full_refresh=False):
+    """
+    Work out where the next sync should start from.
+    Returns None when a full refresh is needed (requested, no watermark yet or
+    no Parquet store to merge into - a legacy CSV is migrated by a full pull).
+    """
+    if full_refresh or not os.path.isdir(PARQUET_DIR):
+        return None
+    watermark = get_watermark(metadata)
+    if watermark is None:
+        return None
+    return watermark.normalize() - pd.Timedelta(days=get_lookback_days())
+
+
+def build_extract_query(table_name, since=None):
+    """Build the extraction query and its bind parameters"""
+    if since is None:
+        query = f"""
+        SELECT *
+        FROM {table_name}
+        ORDER BY START_TIME DESC
+        """
+        return query, None
+
+    query = f"""
+    SELECT *
+    FROM {table_name}
+    WHERE START_TIME >= %(since)s
+    ORDER BY START_TIME DESC
+    """
+    return query, {'since': since.to_pydatetime()}
+
+
+def build_dashboard_query(table_name, athlete=None, since=None, columns=DASHBOARD_COLUMNS):
+    """
+    Build the dashboard's live query and its bind parameters.
+    Selects only the columns the dashboard uses and pushes the athlete and
+    date-window filters down to Snowflake.
+    """
+    conditions = []
+    params = {}
+    if athlete is not None:
+        conditions.append("USER_NAME_FIXED = %(athlete)s")
+        params['athlete'] = athlete
+    if since is not None:
+        conditions.append("START_TIME >= %(since)s")
+        params['since'] = pd.Timestamp(since).to_pydatetime()
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+    SELECT {', '.join(columns)}
+    FROM {table_name}
+    {where}
+    ORDER BY START_TIME DESC
+    """
+    return query, params or None
+
+
+def build_athlete_list_query(table_name):
+    """Build the query listing every athlete in the view"""
+    query = f"""
+    SELECT DISTINCT USER_NAME_FIXED
+    FROM {table_name}
+    WHERE USER_NAME_FIXED IS NOT NULL
+    ORDER BY USER_NAME_FIXED
+    """
+    return query, None
+
+
+def build_fingerprint_query(table_name):
+    """
+    Build a cheap query summarising the whole view: row count, latest
+    START_TIME and an order-independent hash of every row
+    """
+    query = f"""
+    SELECT COUNT(*) AS ROW_COUNT,
+           MAX(START_TIME) AS MAX_START_TIME,
+           HASH_AGG(*) AS CONTENT_HASH
+    FROM {table_name}
+    """
+    return query, None
+
+
+def fingerprint_unchanged(metadata, fingerprint):
+    """True if the view's fingerprint matches the one recorded at the last sync"""
+    previous = metadata.get('fingerprint')
+    return previous is not None and previous == fingerprint
+
+
+def sync_unchanged(metadata, fingerprint, full_refresh=False):
+    """
+    True if an incremental sync has nothing to pull: the view's fingerprint
+    matches the last sync's and the local store exists
+    """
+    return (not full_refresh and os.path.isdir(PARQUET_DIR)
+            and fingerprint_unchanged(metadata, fingerprint))
+
+
+def finish_sync(metadata, summary, since, started, fingerprint):
+    """
+    Record a completed sync: the extractor's own metadata fields plus the
+    watermark, sync mode and the fingerprint the next sync compares against
+    """
+    metadata.update(sync_summary(summary, since, started))
+    metadata['fingerprint'] = fingerprint
+    save_metadata(metadata)
+    return metadata
+
+
+def apply_schema(df):
+    """Cast the known training columns to TRAINING_SCHEMA; other columns are left as they are"""
+    casts = {}
+    for col, dtype in TRAINING_SCHEMA.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if col == 'START_TIME':
+            # Arrow and Snowflake timestamps arrive in us; the store and the dashboard work in ns
+            casts[col] = pd.to_datetime(df[col], format='mixed', errors='coerce').astype('datetime64[ns]')
+        elif dtype == 'category':
+            casts[col] = df[col].astype('category')
+        else:
+            casts[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    return df.assign(**casts) if casts else df
+
+
+def memory_report(df):
+    """
+    Per-column memory of a frame against the same data with plain object /
+    float64 columns, i.e. what it would take without TRAINING_SCHEMA
+    """
+    plain = df.astype({
+        col: ('object' if isinstance(dtype, pd.CategoricalDtype) else 'float64')
+        for col, dtype in df.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype) or dtype == 'float32'
+    })
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': df.memory_usage(index=False, deep=True),
+        'plain_bytes': plain.memory_usage(index=False, deep=True),
+    })
+    report.loc['TOTAL', ['bytes', 'plain_bytes']] = report[['bytes', 'plain_bytes']].sum()
+    report['saving'] = (report['plain_bytes'] / report['bytes']).round(1)
+    return report
+
+
+def prepare_for_store(df):
+    """Apply TRAINING_SCHEMA and add the YEAR partition column"""
+    df = apply_schema(df)
+    if 'START_TIME' in df.columns:
+        df = df.assign(YEAR=df['START_TIME'].dt.year.astype('Int32'))
+    return df
+
+
+def load_local_data(athlete=None, columns=None, since=None, root=PARQUET_DIR):
+    """
+    Load training data from the local store.
+    Only the requested columns are read, and the athlete / since filters prune
+    whole partitions so nothing outside them is touched on disk.
+    """
+    if not os.path.isdir(root):
+        return _load_legacy_csv(athlete, columns, since)
+
+    filters = []
+    if athlete is not None:
+        filters.append(('USER_NAME_FIXED', '=', athlete))
+    if since is not None:
+        filters.append(('YEAR', '>=', int(since.year)))
+        filters.append(('START_TIME', '>=', since))
+
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(list(columns) + ['START_TIME']))
+
+    table = pq.read_table(root, columns=read_columns, filters=filters or None, partitioning='hive')
+    if 'YEAR' in table.column_names:
+        table = table.drop_columns(['YEAR'])
+    df = apply_schema(table.to_pandas())
+    if 'START_TIME' in df.columns:
+        df = df.sort_values('START_TIME', ascending=False, na_position='last', ignore_index=True)
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    return df
+
+
+def _load_legacy_csv(athlete=None, columns=None, since=None):
+    """Read the old training_peaks_data.csv with the same filters as the Parquet store"""
+    if not os.path.exists(CSV_PATH):
+        return pd.DataFrame()
+    df = apply_schema(pd.read_csv(CSV_PATH, usecols=lambda col: columns is None or col in columns or col == 'START_TIME'))
+    if athlete is not None:
+        df = df[df['USER_NAME_FIXED'] == athlete]
+    if since is not None:
+        df = df[df['START_TIME'] >= since]
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    return df.reset_index(drop=True)
+
+
+def merge_incremental(new_rows, since, root=PARQUET_DIR):
+    """
+    Merge freshly fetched rows into the local data.
+    Everything at or after `since` is replaced by what Snowflake returned, so
+    edits and deletions inside the look-back window are reflected too.
+    Only the partitions from since.year onwards are returned - older years are
+    left untouched on disk by save_local_data.
+    """
+    new_rows = prepare_for_store(new_rows)
+
+    hot_start = pd.Timestamp(year=since.year, month=1, day=1)
+    existing = prepare_for_store(load_local_data(since=hot_start, root=root))
+
+    if existing.empty:
+        merged = new_rows
+    else:
+        kept = existing[~(existing['START_TIME'] >= since)]
+        merged = pd.concat([kept, new_rows], ignore_index=True)
+
+    merged = merged.drop_duplicates()
+    return merged.sort_values('START_TIME', ascending=False, na_position='last').reset_index(drop=True)
+
+
+def save_local_data(df, since=None, root=PARQUET_DIR):
+    """
+    Write training data to the partitioned Parquet store.
+    since=None replaces the whole dataset; otherwise only the partitions from
+    since.year onwards (the ones merge_incremental returned) are rewritten.
+    """
+    if since is None:
+        save_batches([df], root=root)
+        return
+
+    df = prepare_for_store(df)
+    # Typed before the old partitions go, so the new ones match the files kept
+    schema = store_schema(df, root)
+    _remove_partitions_from_year(root, since.year)
+    os.makedirs(root, exist_ok=True)
+    _write_partitions(df, root, schema)
+
+
+def save_batches(batches, root=PARQUET_DIR):
+    """
+    Replace the whole store with a stream of batches (Arrow tables or DataFrames).
+    Each batch is typed and written to its partitions before the next one is
+    pulled, so a full refresh never holds the whole view in memory. The new
+    dataset is built next to the old one and swapped in once complete.
+    Returns the number of rows written.
+    """
+    staging = root + '.tmp'
+    if os.path.isdir(staging):
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+
+    row_count = 0
+    schema = None
+    for n, batch in enumerate(batches):
+        if isinstance(batch, pa.Table):
+            batch = batch.to_pandas(split_blocks=True, self_destruct=True)
+        df = prepare_for_store(batch)
+        # Fixed by the first batch, so a later chunk can't re-type a column
+        schema = schema or store_schema(df)
+        _write_partitions(df, staging, schema, basename_template=f'part-{n}-{{i}}.parquet')
+        row_count += len(df)
+
+    if os.path.isdir(root):
+        shutil.rmtree(root)
+    os.replace(staging, root)
+
+    # The Parquet dataset replaces the old CSV - only when this is that dataset,
+    # not a copy written somewhere else
+    if os.path.abspath(root) == os.path.abspath(PARQUET_DIR) and os.path.exists(CSV_PATH):
+        os.remove(CSV_PATH)
+    return row_count
+
+
+def store_schema(df, root=None):
+    """
+    The Arrow schema a write uses for every batch and partition, so each column
+    keeps one type across the store: categories as int32-indexed dictionaries,
+    columns with no values yet as strings rather than Arrow's null type (which
+    no later file could be read against), and with root, the types the files
+    already in that store were written with
+    """
+    existing = {}
+    if root is not None and os.path.isdir(root):
+        existing = {field.name: field.type for field in pq.ParquetDataset(root, partitioning='hive').schema
+                    if field.name not in PARTITION_COLS and not pa.types.is_null(field.type)}
+    fields = []
+    for field in pa.Schema.from_pandas(df, preserve_index=False):
+        if isinstance(df[field.name].dtype, pd.CategoricalDtype):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif field.name in existing:
+            field = field.with_type(existing[field.name])
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def _write_partitions(df, root, schema, basename_template='part-{i}.parquet'):
+    """Write a typed frame into its USER_NAME_FIXED/YEAR partitions under root, against schema"""
+    if df.empty:
+        return
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root_path=root,
+        partition_cols=PARTITION_COLS,
+        basename_template=basename_template,
+        existing_data_behavior='overwrite_or_ignore',
+        compression=PARQUET_COMPRESSION,
+    )
+
+
+def _remove_partitions_from_year(root, year):
+    """Delete YEAR=<y> partitions with y >= year for every athlete"""
+    if not os.path.isdir(root):
+        return
+    for athlete_dir in os.listdir(root):
+        athlete_path = os.path.join(root, athlete_dir)
+        if not os.path.isdir(athlete_path):
+            continue
+        for year_dir in os.listdir(athlete_path):
+            value = year_dir.split('=', 1)[-1]
+            if value.isdigit() and int(value) >= year:
+                shutil.rmtree(os.path.join(athlete_path, year_dir))
+        if not os.listdir(athlete_path):
+            os.rmdir(athlete_path)
+
+
+def store_summary(root=PARQUET_DIR):
+    """Row count, date range, athletes and columns of the whole store (reads two columns only)"""
+    df = load_local_data(columns=['USER_NAME_FIXED', 'START_TIME'], root=root)
+    if df.empty:
+        return {'row_count': 0, 'earliest': None, 'latest': None, 'athletes': [], 'columns': []}
+    columns = pq.ParquetDataset(root, partitioning='hive').schema.names if os.path.isdir(root) else []
+    return {
+        'columns': [col for col in columns if col != 'YEAR'],
+        'row_count': len(df),
+        'earliest': str(df['START_TIME'].min()),
+        'latest': str(df['START_TIME'].max()),
+        'athletes': [str(name) for name in df['USER_NAME_FIXED'].dropna().unique()],
+    }
+
+
+def split_workouts(df):
+    """
+    Split the zone-exploded view into one row per workout (with its TSS and
+    energy) and one row per workout per power zone, keyed by WORKOUT_ID
+    """
+    key = [col for col in WORKOUT_KEY if col in df.columns]
+    measures = [col for col in WORKOUT_MEASURES if col in df.columns]
+    zone_columns = [col for col in ZONE_COLUMNS if col in df.columns]
+    if df.empty or 'START_TIME' not in df.columns:
+        return TrainingData(pd.DataFrame(columns=['WORKOUT_ID'] + key + measures),
+                            pd.DataFrame(columns=['WORKOUT_ID'] + zone_columns))
+
+    workout_id = df.groupby(key, observed=True, dropna=False, sort=False).ngroup().astype('int32')
+    df = df.assign(WORKOUT_ID=workout_id)
+    workouts = df.drop_duplicates('WORKOUT_ID')[['WORKOUT_ID'] + key + measures].reset_index(drop=True)
+    has_zone = df['POWER_ZONE_LABEL'].notna() if 'POWER_ZONE_LABEL' in df.columns else pd.Series(False, index=df.index)
+    zones = df.loc[has_zone, ['WORKOUT_ID'] + zone_columns].reset_index(drop=True)
+    return TrainingData(workouts, zones)
+
+
+def join_workouts(training):
+    """Zone rows with their workout's details - the view's original shape"""
+    joined = training.zones.merge(training.workouts, on='WORKOUT_ID', how='left')
+    return joined[[col for col in DASHBOARD_COLUMNS if col in joined.columns]]
+
+
+def athlete_zone_rows(training, this_week_start):
+    """
+    Zone rows joined to their workouts, newest first, with WEEKS_PAST in the
+    7th column. The join is the only new frame; everything after it works on
+    column references and positional slices of it.
+    """
+    rows = join_workouts(training)
+    rows = rows[rows['START_TIME'].notna()].sort_values(['START_TIME', 'POWER_ZONE_MINIMUM'], ascending=[False, True], ignore_index=True)
+    rows.insert(min(6, len(rows.columns)), 'WEEKS_PAST', week_index.weeks_past(rows['START_TIME'], this_week_start))
+    return rows
+
+
+def slice_recent_weeks(rows, this_week_start, weeks):
+    """
+    Rows from the last `weeks` full weeks (the current week left out) of a
+    newest-first frame, found by binary search on START_TIME and returned as a
+    positional slice - a view under copy-on-write, not a masked copy
+    """
+    window_start = this_week_start - pd.Timedelta(weeks=weeks)
+    # Reversed (a view), the newest-first column is ascending; the search compares
+    # datetime64 values, so the column's own unit is respected
+    ascending = rows['START_TIME'].to_numpy()[::-1]
+    first = len(rows) - np.searchsorted(ascending, this_week_start.asm8, side='left')
+    last = len(rows) - np.searchsorted(ascending, window_start.asm8, side='left')
+    return rows.iloc[first:last]
+
+
+def build_weekly_summary(training):
+    """
+    Aggregate split training data by athlete and Monday week start: workout
+    count, TSS and energy per week (each workout counted once), and summed
+    seconds per power zone with the zone's power range from the most recent
+    workout that week
+    """
+    workouts = training.workouts
+    if workouts.empty:
+        return WeeklySummary(
+            pd.DataFrame(columns=['USER_NAME_FIXED', 'WEEK_START', 'WORKOUTS'] + WORKOUT_MEASURES),
+            pd.DataFrame(columns=['USER_NAME_FIXED', 'WEEK_START'] + ZONE_COLUMNS),
+        )
+    workouts = workouts.assign(WEEK_START=week_index.week_start(workouts['START_TIME']))
+    # Sum in float64 - the stored float32 values would lose precision over a week
+    workouts = workouts.astype({col: 'float64' for col in WORKOUT_MEASURES})
+    totals = workouts.groupby(['USER_NAME_FIXED', 'WEEK_START'], observed=True).agg(
+        WORKOUTS=('WORKOUT_ID', 'size'),
+        TSS=('TSS', 'sum'),
+        ENERGY=('ENERGY', 'sum'),
+    ).reset_index()
+
+    # Each zone row's athlete, week and workout recency are looked up by position
+    # in the (small) workouts frame, rather than joining and sorting a wide copy
+    # of every zone row
+    zones = training.zones
+    position = pd.Index(workouts['WORKOUT_ID']).get_indexer(zones['WORKOUT_ID'])
+    if (position < 0).any():
+        zones, position = zones[position >= 0], position[position >= 0]
+    # 0 for the latest workout, so the latest power range is the smallest recency
+    recency = np.empty(len(workouts), dtype='int32')
+    recency[np.argsort(workouts['START_TIME'].to_numpy(), kind='stable')[::-1]] = np.arange(len(workouts), dtype='int32')
+    keyed = pd.DataFrame({
+        'USER_NAME_FIXED': workouts['USER_NAME_FIXED'].array.take(position),
+        'WEEK_START': workouts['WEEK_START'].to_numpy()[position],
+        'POWER_ZONE_LABEL': zones['POWER_ZONE_LABEL'].array,
+        'RECENCY': recency[position],
+        'POWER_ZONE_SECONDS': zones['POWER_ZONE_SECONDS'].to_numpy(dtype='float64'),
+    }, copy=False)
+    grouped = keyed.groupby(['USER_NAME_FIXED', 'WEEK_START', 'POWER_ZONE_LABEL'], observed=True, sort=False).agg(
+        LATEST=('RECENCY', 'idxmin'),
+        POWER_ZONE_SECONDS=('POWER_ZONE_SECONDS', 'sum'),
+    ).reset_index()
+    latest = grouped.pop('LATEST').to_numpy()
+    grouped.insert(3, 'POWER_ZONE_MINIMUM', zones['POWER_ZONE_MINIMUM'].to_numpy()[latest])
+    grouped.insert(4, 'POWER_ZONE_MAXIMUM', zones['POWER_ZONE_MAXIMUM'].to_numpy()[latest])
+    zones = grouped.sort_values(['USER_NAME_FIXED', 'WEEK_START', 'POWER_ZONE_MINIMUM'], kind='stable', ignore_index=True)
+    return WeeklySummary(totals, zones)
+
+
+def save_weekly_summary(summary, totals_path=WEEKLY_TOTALS_PATH, zones_path=WEEKLY_ZONES_PATH):
+    """Write the weekly summary tables (small enough for a single file each)"""
+    for frame, path in ((summary.totals, totals_path), (summary.zones, zones_path)):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        pq.write_table(table, path + '.tmp', compression=PARQUET_COMPRESSION)
+        os.replace(path + '.tmp', path)
+
+
+def first_changed_week(since):
+    """Monday of the oldest week an incremental sync from `since` can change (merge_incremental keeps everything older)"""
+    return week_index.week_start(pd.Series([pd.Timestamp(since)])).iloc[0]
+
+
+def _replace_weeks(stored, fresh, first_week, order):
+    """stored's rows before first_week followed by fresh, sorted by order as a full build would be"""
+    frame = stored[stored['WEEK_START'] < first_week]
+    if not fresh.empty:
+        frame = pd.concat([frame, fresh], ignore_index=True)
+    # Categories differ once an athlete or zone appears in only one part
+    frame = frame.astype({col: 'category' for col in frame.columns if TRAINING_SCHEMA.get(col) == 'category'})
+    return frame.sort_values(order, kind='stable', ignore_index=True)
+
+
+def refresh_weekly_summary(since=None, root=PARQUET_DIR, totals_path=WEEKLY_TOTALS_PATH, zones_path=WEEKLY_ZONES_PATH):
+    """
+    Bring the weekly summary up to date with the local store after a sync,
+    returning its (totals, zones) row counts. After an incremental sync only the
+    weeks from first_changed_week(since) are re-aggregated; older stored weeks are kept.
+    """
+    stored = load_weekly_summary(totals_path=totals_path, zones_path=zones_path) if since is not None else None
+    if stored is None:
+        summary = build_weekly_summary(split_workouts(load_local_data(columns=DASHBOARD_COLUMNS, root=root)))
+    else:
+        first_week = first_changed_week(since)
+        fresh = build_weekly_summary(split_workouts(load_local_data(columns=DASHBOARD_COLUMNS, since=first_week, root=root)))
+        summary = WeeklySummary(
+            _replace_weeks(stored.totals, fresh.totals, first_week, ['USER_NAME_FIXED', 'WEEK_START']),
+            _replace_weeks(stored.zones, fresh.zones, first_week, ['USER_NAME_FIXED', 'WEEK_START', 'POWER_ZONE_MINIMUM']),
+        )
+    save_weekly_summary(summary, totals_path, zones_path)
+    return len(summary.totals), len(summary.zones)
+
+
+def load_weekly_summary(athlete=None, since=None, totals_path=WEEKLY_TOTALS_PATH, zones_path=WEEKLY_ZONES_PATH):
+    """Read the weekly summary tables, or None if no sync has written them yet"""
+    if not (os.path.exists(totals_path) and os.path.exists(zones_path)):
+        return None
+    filters = []
+    if athlete is not None:
+        filters.append(('USER_NAME_FIXED', '=', athlete))
+    if since is not None:
+        filters.append(('WEEK_START', '>=', pd.Timestamp(since)))
+    return WeeklySummary(
+        pq.read_table(totals_path, filters=filters or None).to_pandas(),
+        pq.read_table(zones_path, filters=filters or None).to_pandas(),
+    )
+
+
+def sync_summary(summary, since, started):
+    """
+    Metadata fields shared by every extractor after a sync. started is when the
+    sync began; the watermark never passes it, so rows dated later are re-fetched.
+    """
+    latest = _first_timestamp(summary['latest'])
+    return {
+        'athletes': summary['athletes'],
+        'watermark': str(min(latest, pd.Timestamp(started))) if latest is not None else None,
+        'sync_mode': 'full' if since is None else 'incremental',
+        'sync_since': str(since) if since is not None else None,
+    }
@@ -4,17 +4,21 @@ Automated Training Peaks Data Extractor
 Runs locally at midnight to pull data from Snowflake and commit to repo
 """
 
-import pandas as pd
 import snowflake.connector
 from datetime import datetime
 import os
+import shutil
 import subprocess
 import sys
+import data_store
+import snowflake_fetch
+import rolling_state
 
-def extract_training_peaks_data():
-    """Extract data from Snowflake and save to CSV"""
+def extract_training_peaks_data(full_refresh=False):
+    """Extract data from Snowflake and save to the local Parquet store"""
     
-    print(f"Starting data extraction at {datetime.now()}")
+    started = datetime.now()
+    print(f"Starting data extraction at {started}")
     
     try:
         # Connect to Snowflake using Azure AD (local access)
@@ -29,50 +33,61 @@ def extract_training_peaks_data():
             schema='SMARTABASE'
         )
         
+        table_name = "CONSUME.SMARTABASE.TRAINING_PEAKS_CYCLING_VW"
+        previous_metadata = data_store.load_metadata()
+        
+        # Cheap fingerprint first - if the view hasn't changed there's nothing to pull
+        fingerprint = snowflake_fetch.fetch_fingerprint(ctx, table_name)
+        if data_store.sync_unchanged(previous_metadata, fingerprint, full_refresh):
+            ctx.close()
+            print(f"No changes since last sync ({fingerprint['row_count']} rows, latest {fingerprint['max_start_time']}) - skipping extraction")
+            return True, False, fingerprint['row_count']
+        
+        # Only pull rows newer than the last sync (minus the look-back window)
+        since = data_store.get_sync_start(previous_metadata, full_refresh=full_refresh)
+        
         # Query the Training Peaks cycling view
-        print("Extracting training data...")
-        query = "SELECT * FROM CONSUME.SMARTABASE.TRAINING_PEAKS_CYCLING_VW ORDER BY START_TIME DESC"
-        df = pd.read_sql(query, ctx)
+        if since is None:
+            print("Extracting training data (full refresh)...")
+        else:
+            print(f"Extracting training data (incremental since {since})...")
+        query, params = data_store.build_extract_query(table_name, since)
+        rows_fetched = snowflake_fetch.fetch_into_store(ctx, query, params, since)
         
         # Close connection
         ctx.close()
         
-        # Save to CSV with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        csv_filename = 'data/training_peaks_data.csv'
-        
-        # Create data directory if it doesn't exist
-        os.makedirs('data', exist_ok=True)
-        
-        # Save current data
-        df.to_csv(csv_filename, index=False)
+        summary = data_store.store_summary()
         
-        # Also save with timestamp for backup
-        backup_filename = f'data/backup/training_peaks_data_{timestamp}.csv'
+        # Also save a timestamped snapshot of the store for backup
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_dir = f'data/backup/training_peaks_{timestamp}'
         os.makedirs('data/backup', exist_ok=True)
-        df.to_csv(backup_filename, index=False)
+        shutil.copytree(data_store.PARQUET_DIR, backup_dir)
         
-        print(f"Data extracted: {len(df)} records")
-        print(f"Saved to: {csv_filename}")
+        print(f"Data extracted: {rows_fetched} records ({summary['row_count']} in store)")
+        print(f"Saved to: {data_store.PARQUET_DIR}")
+        
+        # Pre-aggregate the weekly totals and zone seconds the dashboard charts read
+        total_rows, zone_rows, state_rows, recomputed = rolling_state.refresh_after_sync(since)
+        print(f"Weekly summary: {total_rows} athlete-weeks, {zone_rows} athlete-week-zones")
+        print(f"Rolling averages: {recomputed} of {state_rows} athlete-metric-weeks recomputed")
         
         # Create metadata file
         metadata = {
             'last_updated': datetime.now().isoformat(),
-            'record_count': len(df),
-            'date_range_start': str(df['START_TIME'].min()) if not df.empty else None,
-            'date_range_end': str(df['START_TIME'].max()) if not df.empty else None,
-            'athletes': df['USER_NAME_FIXED'].unique().tolist() if not df.empty else []
+            'record_count': summary['row_count'],
+            'date_range_start': summary['earliest'],
+            'date_range_end': summary['latest'],
+            'athletes': summary['athletes']
         }
+        data_store.finish_sync(metadata, summary, since, started, fingerprint)
         
-        import json
-        with open('data/metadata.json', 'w') as f:
-            json.dump(metadata, f, indent=2)
-        
-        return True, csv_filename, len(df)
+        return True, True, summary['row_count']
         
     except Exception as e:
         print(f"Error extracting data: {e}")
-        return False, None, 0
+        return False, False, 0
 
 def commit_and_push_data():
     """Git commit and push the updated data"""
@@ -112,9 +127,13 @@ def main():
     print("=" * 50)
     
     # Extract data
-    success, filename, record_count = extract_training_peaks_data()
+    success, changed, record_count = extract_training_peaks_data(
+        full_refresh=data_store.full_refresh_requested(sys.argv[1:])
+    )
     
-    if success:
+    if success and not changed:
+        print(f"✅ Data unchanged: {record_count} records - nothing to commit")
+    elif success:
         print(f"✅ Data extraction successful: {record_count} records")
         
         # Commit and push
@@ -0,0 +1,200 @@
+"""
+Weekly report generator for every athlete
+Reads the weekly summary tables and rolling state written by the sync and
+renders each athlete's dashboard charts to static HTML (or PNG) under reports/,
+one athlete per worker process. Runs headless after the sync job; the Streamlit
+app is never involved.
+
+Settings (environment variables):
+  REPORT_DIR      output directory (default reports)
+  REPORT_WEEKS    weeks of history per chart (default 12)
+  REPORT_FORMAT   html or png (png needs the kaleido package)
+  REPORT_WORKERS  worker processes (default: one per CPU)
+"""
+import html
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.offline
+
+import athlete_summary
+import dashboard_figures
+import data_store
+import rolling_state
+import week_index
+
+pd.set_option('mode.copy_on_write', True)
+
+REPORT_DIR = os.environ.get('REPORT_DIR', 'reports')
+REPORT_WEEKS = int(os.environ.get('REPORT_WEEKS', 12))
+REPORT_FORMAT = os.environ.get('REPORT_FORMAT', 'html')
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 0)) or os.cpu_count() or 1
+DASHBOARD_TIMEZONE = os.environ.get('DASHBOARD_TIMEZONE') or None
+
+# Shared by every athlete page, written once next to them
+PLOTLY_JS = 'plotly.min.js'
+
+
+def athlete_slug(athlete):
+    """File-name-safe version of an athlete's name"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', athlete).strip('_') or 'athlete'
+
+
+def report_charts(summary):
+    """(title, figure) for each chart the dashboard's athlete tabs show, skipping those without data"""
+    charts = []
+    if not summary.time.empty:
+        charts.append(("Weekly Training Time with Rolling Averages", dashboard_figures.weekly_metric_figure(
+            summary.time, 'HOURS', 'Weekly Hours', 'lightblue', 'Hours: %{y}<extra></extra>',
+            'hours', "Training Time (Hours)")))
+    if not summary.tss.empty:
+        charts.append(("Weekly TSS with Rolling Averages", dashboard_figures.weekly_metric_figure(
+            summary.tss, 'TSS', 'Weekly TSS', 'lightcoral', 'TSS: %{y}<extra></extra>',
+            'TSS', "TSS")))
+    if not summary.energy.empty:
+        charts.append(("Weekly Energy (kJ) with Rolling Averages", dashboard_figures.weekly_metric_figure(
+            summary.energy, 'ENERGY_KJ', 'Weekly Energy (kJ)', 'lightgreen', 'Energy: %{y} kJ<extra></extra>',
+            'kJ', "Energy (kJ)")))
+    if not summary.zone_minutes.empty:
+        charts.append(("Power Zone Distribution", dashboard_figures.compact_zone_figure(
+            summary.zone_minutes, summary.zone_names)))
+    return charts
+
+
+def write_html(athlete, charts, out_dir, generated):
+    """One page per athlete with every chart, loading plotly.js from the shared file"""
+    body = "\n".join(
+        f"<h2>{html.escape(title)}</h2>\n{fig.to_html(full_html=False, include_plotlyjs=False)}"
+        for title, fig in charts
+    )
+    path = os.path.join(out_dir, f"{athlete_slug(athlete)}.html")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(athlete)}</title>"
+                f"<script src=\"{PLOTLY_JS}\"></script></head><body>\n"
+                f"<h1>{html.escape(athlete)}</h1>\n<p>{html.escape(generated)}</p>\n{body}\n</body></html>\n")
+    return [path]
+
+
+def write_png(athlete, charts, out_dir):
+    """One image per chart; the zone chart is written once as minutes and once as percentages"""
+    images = []
+    for title, fig in charts:
+        if fig.layout.updatemenus:
+            # Static images can't use the Minutes / % switch, so each view gets its own image
+            images.append((f"{title} (%)", static_zone_figure(fig, percent=True)))
+            fig = static_zone_figure(fig, percent=False)
+        images.append((title, fig))
+    paths = []
+    for title, fig in images:
+        path = os.path.join(out_dir, f"{athlete_slug(athlete)}_{athlete_slug(title)}.png")
+        fig.write_image(path, width=1200, height=500)
+        paths.append(path)
+    return paths
+
+
+def static_zone_figure(fig, percent):
+    """A copy of the compact zone chart fixed on one view, without its switch"""
+    view = fig.layout.updatemenus[0].buttons[1 if percent else 0]
+    static = go.Figure(fig)
+    static.update_traces(**view.args[0])
+    static.update_layout(barnorm=view.args[1]['barnorm'], yaxis_title=view.args[1]['yaxis.title.text'])
+    static.layout.updatemenus = ()
+    return static
+
+
+def render_athlete(athlete, this_week_start, weeks, out_dir, fmt, generated):
+    """
+    Worker: load one athlete's weekly summary, build their charts and write them.
+    Returns the files written, or None if no displayed week has data.
+    """
+    since = this_week_start - pd.Timedelta(weeks=weeks + athlete_summary.SEASON_WEEKS)
+    weekly = data_store.load_weekly_summary(athlete=athlete, since=since)
+    state = rolling_state.load_rolling_state(athlete=athlete)
+    summary = athlete_summary.build_athlete_summary(weekly, this_week_start, weeks, state)
+    if athlete_summary.summary_is_empty(summary):
+        return None
+    charts = report_charts(summary)
+    if fmt == 'png':
+        return write_png(athlete, charts, out_dir)
+    return write_html(athlete, charts, out_dir, generated)
+
+
+def write_index(reports, out_dir, generated):
+    """Index page linking every athlete's report"""
+    links = "\n".join(
+        f"<li><a href=\"{html.escape(os.path.basename(paths[0]))}\">{html.escape(athlete)}</a></li>"
+        for athlete, paths in sorted(reports.items())
+    )
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Weekly reports</title></head><body>\n"
+                f"<h1>Weekly reports</h1>\n<p>{html.escape(generated)}</p>\n<ul>\n{links}\n</ul>\n</body></html>\n")
+
+
+def generate_reports(out_dir=REPORT_DIR, weeks=REPORT_WEEKS, fmt=REPORT_FORMAT, workers=REPORT_WORKERS):
+    """Render every athlete with data in the report window, returning True if all of them succeeded"""
+    if fmt not in ('html', 'png'):
+        print(f"❌ Unknown REPORT_FORMAT '{fmt}' - use html or png")
+        return False
+    if fmt == 'png':
+        try:
+            import kaleido  # noqa: F401 - plotly's image export backend
+        except ImportError:
+            print("❌ PNG reports need the kaleido package (pip install kaleido)")
+            return False
+
+    this_week_start = week_index.current_week_start(tz=DASHBOARD_TIMEZONE)
+    weekly = data_store.load_weekly_summary(since=this_week_start - pd.Timedelta(weeks=weeks))
+    if weekly is None:
+        print("❌ No weekly summary found - run a sync first")
+        return False
+    # The current week is still in progress and isn't charted, so athletes with only that week are left out
+    totals = weekly.totals[weekly.totals['WEEK_START'] < this_week_start]
+    zones = weekly.zones[weekly.zones['WEEK_START'] < this_week_start]
+    athletes = sorted(set(totals['USER_NAME_FIXED'].astype(str)) | set(zones['USER_NAME_FIXED'].astype(str)))
+    del totals, zones
+    del weekly
+
+    os.makedirs(out_dir, exist_ok=True)
+    generated = f"Week starting {this_week_start:%Y-%m-%d}, last {weeks} weeks - generated {datetime.now():%Y-%m-%d %H:%M}"
+    if fmt == 'html':
+        with open(os.path.join(out_dir, PLOTLY_JS), 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+    print(f"📊 Rendering {len(athletes)} athletes ({fmt}, last {weeks} weeks) with {workers} workers...")
+    started = time.perf_counter()
+    reports, skipped, failed = {}, [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(render_athlete, athlete, this_week_start, weeks, out_dir, fmt, generated): athlete
+            for athlete in athletes
+        }
+        for future in as_completed(futures):
+            athlete = futures[future]
+            try:
+                paths = future.result()
+            except Exception as e:
+                print(f"❌ {athlete}: {e}")
+                failed.append(athlete)
+                continue
+            if paths is None:
+                skipped.append(athlete)
+            else:
+                reports[athlete] = paths
+
+    if fmt == 'html':
+        write_index(reports, out_dir, generated)
+    files = sum(len(paths) for paths in reports.values())
+    print(f"✅ Wrote {files} files for {len(reports)} athletes to {out_dir} in {time.perf_counter() - started:.1f} s")
+    if skipped:
+        print(f"⏭️ Skipped {len(skipped)} athletes with no data in the last {weeks} weeks: {', '.join(sorted(skipped))}")
+    return not failed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if generate_reports() else 1)
@@ -0,0 +1,87 @@
+"""
+Rolling weekly averages computed from a table of weight kernels
+Every average is a weighted sum over the current row and the rows before it
+(rows are weeks in the order given, so with WEEKS_PAST ascending "before" means
+more recent). The sums slide each kernel over a strided view of the data, so any
+number of metrics and athletes are handled together without a Python loop over weeks.
+"""
+
+import numpy as np
+
+# name -> (weights oldest to newest in the window, partial-window alignment).
+# With fewer rows than weights, 'last' uses the last len weights and 'first' the
+# first len weights - the same edge weighting the dashboard has always used.
+# 'mean' is an unweighted average with min_periods=1, left to pandas' running-sum
+# rolling mean so it agrees with what the 4-week average always showed.
+ROLLING_KERNELS = {
+    'ROLLING_4WK_AVG': ([1, 1, 1, 1], 'mean'),
+    'ROLLING_8WK_WEIGHTED_AVG': ([1, 2, 3, 4, 4, 3, 2, 1], 'last'),
+    'ROLLING_8WK_LOG_AVG': ([1, 2, 3, 4, 5, 6, 7, 8], 'first'),
+}
+
+
+def _partial_weights(weights, n, align):
+    """Weights for a window holding only n rows"""
+    return weights[-n:] if align == 'last' else weights[:n]
+
+
+def rolling_weighted(values, positions, weights, align='last', rows=None):
+    """
+    Weighted rolling average of each column of values (n x m).
+    positions[i] is row i's index within its own series (0 for the first
+    row of each athlete), so windows never reach into another series.
+    rows (a boolean mask) limits the work to those rows; the result then has
+    one row per selected row, each identical to what a full pass gives.
+    """
+    values = np.asarray(values, dtype='float64')
+    if values.ndim == 1:
+        values = values[:, None]
+    k = len(weights)
+    weights = np.asarray(weights, dtype='float64')
+
+    # windows[i, j] holds rows i-k+1 .. i of column j (zero-padded at the start);
+    # a strided view, so sliding the kernel copies nothing up front
+    padded = np.concatenate([np.zeros((k - 1, values.shape[1])), values])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, k, axis=0)
+
+    index = np.arange(len(values)) if rows is None else np.flatnonzero(rows)
+    filled = np.minimum(np.asarray(positions)[index], k - 1) + 1
+    result = np.full((len(index), values.shape[1]), np.nan)
+    # One vectorised weighted sum per window fill level (k of them at most)
+    for n in np.unique(filled):
+        level = filled == n
+        w = _partial_weights(weights, n, align)
+        result[level] = (windows[index[level]][:, :, k - n:] * w).sum(axis=-1) / w.sum()
+    return result
+
+
+def rolling_averages(df, columns, order_by='WEEKS_PAST', group_by=None, kernels=ROLLING_KERNELS):
+    """
+    Add a column per kernel (and per value column) to df, sorted by group_by
+    then order_by. A single column name gives columns named after the kernels
+    (e.g. ROLLING_4WK_AVG); a list gives '<column>_<kernel>' for each.
+    """
+    single = isinstance(columns, str)
+    columns = [columns] if single else list(columns)
+    sort_cols = ([group_by] if group_by else []) + [order_by]
+    df = df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+
+    if group_by:
+        positions = df.groupby(group_by, observed=True, sort=False).cumcount().to_numpy()
+    else:
+        positions = np.arange(len(df))
+
+    values = df[columns].to_numpy(dtype='float64')
+    results = {}
+    for name, (weights, align) in kernels.items():
+        if align == 'mean':
+            frame = df.groupby(group_by, observed=True)[columns] if group_by else df[columns]
+            averaged = frame.rolling(window=len(weights), min_periods=1).mean()
+            if group_by:
+                averaged = averaged.reset_index(level=0, drop=True)
+            averaged = averaged.sort_index().to_numpy()
+        else:
+            averaged = rolling_weighted(values, positions, weights, align)
+        for i, col in enumerate(columns):
+            results[name if single else f'{col}_{name}'] = averaged[:, i]
+    return df.assign(**results)
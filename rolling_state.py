@@ -0,0 +1,186 @@
+"""
+Persisted rolling averages for every athlete and metric, updated in place after
+each sync and read by the dashboard and the weekly reports.
+Each week's averages cover that week and the (up to 7) newer weeks with data
+before it in WEEKS_PAST order, as the dashboard charts them. A new or revised
+week therefore only changes the weighted averages of itself and the next 7
+older weeks; everything further back is read from the stored state instead of
+recomputed. The 4-week mean is pandas' running mean, as the dashboard computes
+it, so it is recomputed over each series a sync touches to keep the same bits.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import data_store
+import rolling_metrics
+
+ROLLING_STATE_PATH = os.path.join(data_store.DATA_DIR, 'rolling_state.parquet')
+
+SERIES_KEY = ['USER_NAME_FIXED', 'METRIC']
+STATE_KEY = SERIES_KEY + ['WEEK_START']
+
+# metric -> decimals the weekly value is rounded to before averaging (as charted)
+METRICS = {'HOURS': 2, 'TSS': 1, 'ENERGY_KJ': 1}
+
+
+def weekly_values(summary):
+    """One row per athlete, metric and week with data: USER_NAME_FIXED, METRIC, WEEK_START, VALUE"""
+    time = summary.zones.groupby(['USER_NAME_FIXED', 'WEEK_START'], observed=True)['POWER_ZONE_SECONDS'].sum()
+    totals = summary.totals.set_index(['USER_NAME_FIXED', 'WEEK_START'])
+    metrics = {
+        'HOURS': time / 3600,
+        'TSS': totals['TSS'],
+        'ENERGY_KJ': totals['ENERGY'] / 1000,
+    }
+    values = pd.concat([
+        series.round(METRICS[metric]).rename('VALUE').reset_index().assign(METRIC=metric)
+        for metric, series in metrics.items()
+    ], ignore_index=True)
+    values['USER_NAME_FIXED'] = values['USER_NAME_FIXED'].astype(str)
+    values['VALUE'] = values['VALUE'].astype('float64')
+    # Newest week first within each series, the order the averages run in
+    return values[STATE_KEY + ['VALUE']].sort_values(
+        STATE_KEY, ascending=[True, True, False], ignore_index=True
+    )
+
+
+def _with_averages(state, affected, kernels=rolling_metrics.ROLLING_KERNELS):
+    """
+    state (newest week first within each series) with a column per kernel,
+    computed for the affected rows; the other rows keep their stored averages.
+    A 'mean' kernel is pandas' running-sum rolling mean, as the dashboard
+    computes it; its last bit depends on every newer week of the series, so it
+    is recomputed over the whole of each series with an affected row.
+    """
+    series = state.groupby(SERIES_KEY, sort=False)
+    positions = series.cumcount().to_numpy()
+    measured = state[['VALUE']].to_numpy(dtype='float64')
+    group = series.ngroup().to_numpy()
+    touched = np.isin(group, np.unique(group[affected]))
+    averages = {}
+    for name, (weights, align) in kernels.items():
+        column = state[name].to_numpy(dtype='float64', copy=True) if name in state.columns else np.full(len(state), np.nan)
+        if align == 'mean':
+            rolled = state.loc[touched].groupby(SERIES_KEY, sort=False)['VALUE'].rolling(len(weights), min_periods=1).mean()
+            column[touched] = rolled.droplevel(list(range(len(SERIES_KEY)))).sort_index().to_numpy()
+        else:
+            column[affected] = rolling_metrics.rolling_weighted(measured, positions, weights, align, rows=affected)[:, 0]
+        averages[name] = column
+    return state.assign(**averages)
+
+
+def build_rolling_state(values, kernels=rolling_metrics.ROLLING_KERNELS):
+    """Compute every week's averages from scratch (the full rebuild)"""
+    return _with_averages(values, np.ones(len(values), dtype=bool), kernels)
+
+
+def update_rolling_state(previous, values, first_week, kernels=rolling_metrics.ROLLING_KERNELS):
+    """
+    Bring a stored state up to date after an incremental sync, returning
+    (state, weeks recomputed). values holds the weekly values from first_week on,
+    the only weeks the sync can change. They replace the stored weeks from
+    first_week on. In a series with weeks from first_week on (before or after
+    the sync), only the newest (window - 1) older weeks have a window reaching
+    past first_week (or a partial one), so only those are recomputed; the
+    rest, and every week of the series the sync didn't touch, keep their
+    stored averages (apart from the running mean, see _with_averages).
+    """
+    if not set(kernels) <= set(previous.columns):
+        return build_rolling_state(values, kernels), len(values)
+    kept = previous.loc[previous['WEEK_START'] < first_week, STATE_KEY + ['VALUE'] + list(kernels)]
+    state = pd.concat([values, kept], ignore_index=True).sort_values(
+        STATE_KEY, ascending=[True, True, False], kind='stable', ignore_index=True
+    )
+
+    synced = pd.concat([values[SERIES_KEY], previous.loc[previous['WEEK_START'] >= first_week, SERIES_KEY]])
+    in_synced = pd.MultiIndex.from_frame(state[SERIES_KEY]).isin(pd.MultiIndex.from_frame(synced))
+    window = max(len(weights) for weights, _ in kernels.values())
+    old = (state['WEEK_START'] < first_week).to_numpy()
+    affected = ~old
+    newest_old = state[old].groupby(SERIES_KEY, sort=False).cumcount().to_numpy() < window - 1
+    affected[np.flatnonzero(old)[newest_old]] = True
+    affected &= in_synced
+    return _with_averages(state, affected, kernels), int(affected.sum())
+
+
+def save_rolling_state(state, path=ROLLING_STATE_PATH):
+    """Write the rolling state (a single small file)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(state, preserve_index=False), path + '.tmp',
+                   compression=data_store.PARQUET_COMPRESSION)
+    os.replace(path + '.tmp', path)
+
+
+def load_rolling_state(athlete=None, path=ROLLING_STATE_PATH):
+    """Read the rolling state, or None if no sync has written it yet"""
+    if not os.path.exists(path):
+        return None
+    filters = [('USER_NAME_FIXED', '=', athlete)] if athlete is not None else None
+    state = pq.read_table(path, filters=filters).to_pandas()
+    return state.sort_values(STATE_KEY, ascending=[True, True, False], ignore_index=True)
+
+
+def refresh_rolling_state(since=None, path=ROLLING_STATE_PATH):
+    """
+    Update the rolling state from the weekly summary after a sync, returning
+    (weeks in state, weeks recomputed). since is where an incremental sync
+    started; None (a full sync) or no stored state rebuilds every week.
+    """
+    previous = load_rolling_state(path=path) if since is not None else None
+    first_week = data_store.first_changed_week(since) if previous is not None else None
+    summary = data_store.load_weekly_summary(since=first_week)
+    if summary is None:
+        return 0, 0
+    values = weekly_values(summary)
+    if previous is None:
+        state, recomputed = build_rolling_state(values), len(values)
+    else:
+        state, recomputed = update_rolling_state(previous, values, first_week)
+    save_rolling_state(state, path)
+    return len(state), recomputed
+
+
+def refresh_after_sync(since=None):
+    """
+    Update the weekly summary tables and the rolling state after a sync from
+    `since` (None for a full sync), returning (totals rows, zone rows, state
+    weeks, weeks recomputed)
+    """
+    total_rows, zone_rows = data_store.refresh_weekly_summary(since)
+    state_rows, recomputed = refresh_rolling_state(since)
+    return total_rows, zone_rows, state_rows, recomputed
+
+
+def verify_rolling_state(path=ROLLING_STATE_PATH):
+    """Rebuild the state from the weekly summary and count the weeks where the stored one differs"""
+    summary = data_store.load_weekly_summary()
+    stored = load_rolling_state(path=path)
+    if summary is None or stored is None:
+        return None
+    rebuilt = build_rolling_state(weekly_values(summary))
+    if len(stored) != len(rebuilt):
+        return abs(len(stored) - len(rebuilt))
+    columns = STATE_KEY + ['VALUE'] + list(rolling_metrics.ROLLING_KERNELS)
+    stored, rebuilt = stored[columns].reset_index(drop=True), rebuilt[columns].reset_index(drop=True)
+    differs = ~((stored == rebuilt) | (stored.isna() & rebuilt.isna())).all(axis=1)
+    return int(differs.sum())
+
+
+if __name__ == "__main__":
+    if '--rebuild' in sys.argv[1:]:
+        weeks, recomputed = refresh_rolling_state()
+        print(f"✅ Rebuilt rolling state ({weeks} athlete-metric-weeks)")
+    else:
+        mismatches = verify_rolling_state()
+        if mismatches is None:
+            print("❌ No weekly summary or rolling state found - run a sync first")
+            sys.exit(1)
+        print("✅ Rolling state matches a full rebuild" if mismatches == 0
+              else f"❌ {mismatches} weeks differ from a full rebuild")
+        sys.exit(0 if mismatches == 0 else 1)
@@ -53,6 +53,16 @@ if %ERRORLEVEL% EQU 0 (
     ) else (
         echo ℹ️ No new data changes to commit
     )
+    
+    REM Render every athlete's weekly report from the synced data
+    echo.
+    echo 📊 Generating weekly reports...
+    python generate_reports.py
+    if %ERRORLEVEL% EQU 0 (
+        echo ✅ Weekly reports written to the reports folder
+    ) else (
+        echo ⚠️ Some weekly reports failed - see the messages above
+    )
 ) else (
     echo ❌ Data extraction failed - skipping GitHub sync
 )
@@ -0,0 +1,73 @@
+"""
+Shared Snowflake fetch layer
+Streams query results through the connector's Arrow batch interface instead of
+pd.read_sql, so rows never go through per-row Python conversion
+"""
+
+import pyarrow as pa
+import data_store
+
+
+def iter_arrow_batches(conn, query, params=None):
+    """
+    Execute a query and yield the result one Arrow table per result chunk.
+    Chunks are downloaded as they are consumed, so memory is bounded by the
+    chunk size rather than the size of the result.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        for batch in cursor.fetch_arrow_batches():
+            yield batch
+    finally:
+        cursor.close()
+
+
+def fetch_arrow_table(conn, query, params=None):
+    """Execute a query and return the whole result as one Arrow table"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        batches = list(cursor.fetch_arrow_batches())
+        if not batches:
+            # Empty result - keep the column names so callers can still check for them
+            columns = [col[0] for col in cursor.description or []]
+            return pa.table({col: pa.array([], type=pa.null()) for col in columns})
+    finally:
+        cursor.close()
+
+    # concat_tables just stitches the chunks together, no data is copied
+    return pa.concat_tables(batches, promote_options='default')
+
+
+def fetch_dataframe(conn, query, params=None):
+    """Execute a query and return the result as a DataFrame"""
+    table = fetch_arrow_table(conn, query, params)
+    # self_destruct frees each Arrow column as soon as it has been converted
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def fetch_into_store(conn, query, params=None, since=None):
+    """
+    Run an extraction query and write the result into the local Parquet store.
+    Full refreshes (since=None) stream chunk by chunk straight to disk;
+    incremental pulls are small and get merged into the recent partitions.
+    Returns the number of rows fetched.
+    """
+    if since is None:
+        return data_store.save_batches(iter_arrow_batches(conn, query, params))
+
+    df_new = fetch_dataframe(conn, query, params)
+    data_store.save_local_data(data_store.merge_incremental(df_new, since), since)
+    return len(df_new)
+
+
+def fetch_fingerprint(conn, table_name):
+    """Run the fingerprint query and return it as a JSON-friendly dict"""
+    query, params = data_store.build_fingerprint_query(table_name)
+    row = fetch_dataframe(conn, query, params).iloc[0]
+    return {
+        'row_count': int(row['ROW_COUNT']),
+        'max_start_time': str(row['MAX_START_TIME']),
+        'content_hash': str(row['CONTENT_HASH']),
+    }
@@ -0,0 +1,118 @@
+"""
+Process-wide Snowflake connection pool
+Keeps authenticated sessions open between Streamlit reruns and user sessions so
+a cache miss doesn't pay for a TLS handshake, login (or SSO browser round-trip)
+every time
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import snowflake.connector
+
+
+class SnowflakeConnectionPool:
+    """Thread-safe pool of Snowflake connections with a cap on concurrent sessions"""
+
+    def __init__(self, conn_params, max_connections=4, max_idle_seconds=900,
+                 health_check_after_seconds=60, acquire_timeout=60):
+        self.conn_params = self._session_params(conn_params)
+
+        self.max_connections = max_connections
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_after_seconds = health_check_after_seconds
+        self.acquire_timeout = acquire_timeout
+
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+
+    @contextmanager
+    def connection(self):
+        """Borrow a healthy connection for the duration of a with-block"""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No Snowflake connection free after {self.acquire_timeout}s")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except snowflake.connector.errors.Error:
+            # The session may be broken (expired token, dropped network) - don't reuse it
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def uses(self, conn_params):
+        """Whether the pool connects with these parameters - false once the credentials rotate"""
+        return self._session_params(conn_params) == self.conn_params
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def _checkout(self):
+        """Take the most recently used idle connection that still works, or open a new one"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.max_idle_seconds:
+                self._discard(conn)
+                continue
+            if idle_for > self.health_check_after_seconds and not self._is_healthy(conn):
+                self._discard(conn)
+                continue
+            return conn
+        return snowflake.connector.connect(**self.conn_params)
+
+    def _checkin(self, conn):
+        """Return a connection to the pool"""
+        if conn.is_closed():
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    @staticmethod
+    def _session_params(conn_params):
+        """Connection parameters with the options every pooled session needs"""
+        # Keep the session token alive while connections sit idle in the pool
+        params = dict(conn_params, client_session_keep_alive=True)
+        if params.get('authenticator') == 'externalbrowser':
+            # Re-use the SSO token on reconnect instead of opening the browser again
+            params.setdefault('client_store_temporary_credential', True)
+        return params
+
+    @staticmethod
+    def _is_healthy(conn):
+        """Cheap round-trip to check the session hasn't expired"""
+        if conn.is_closed():
+            return False
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+            return True
+        except snowflake.connector.errors.Error:
+            return False
+
+    @staticmethod
+    def _discard(conn):
+        """Close a connection, ignoring errors from one that is already dead"""
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,53 @@
+"""
+Weekly hours, TSS, energy and zone percentages for every athlete at once,
+from the weekly summary tables (data_store.WeeklySummary) for the whole squad
+"""
+
+from collections import namedtuple
+
+import pandas as pd
+
+import week_index
+
+# metrics: one row per athlete and displayed week (WEEKS_PAST 1..weeks) with
+# HOURS, TSS and ENERGY_KJ. zone_percent: one row per athlete, week and zone
+# with POWER_ZONE_PERCENT. zone_order lists the zone labels lowest zone first.
+SquadSummary = namedtuple('SquadSummary', ['metrics', 'zone_percent', 'zone_order'])
+
+ATHLETE_WEEK = ['USER_NAME_FIXED', 'WEEK_START']
+
+
+def build_squad_summary(weekly, this_week_start, weeks):
+    """
+    Aggregate every athlete's weekly summary in one groupby over athlete x
+    week, with values rounded the same way as the single-athlete tabs.
+    """
+    first_week = this_week_start - pd.Timedelta(weeks=weeks)
+    zones = weekly.zones[(weekly.zones['WEEK_START'] >= first_week) & (weekly.zones['WEEK_START'] < this_week_start)]
+    totals = weekly.totals[(weekly.totals['WEEK_START'] >= first_week) & (weekly.totals['WEEK_START'] < this_week_start)]
+    if zones.empty and totals.empty:
+        return SquadSummary(pd.DataFrame(columns=ATHLETE_WEEK + ['WEEKS_PAST', 'HOURS', 'TSS', 'ENERGY_KJ']),
+                            pd.DataFrame(columns=ATHLETE_WEEK + ['POWER_ZONE_LABEL', 'POWER_ZONE_PERCENT']), [])
+
+    # One grouping of the zone rows by athlete-week gives the week's time in
+    # zones, each zone's share of it and the zone's rank within the week
+    zones = zones.assign(MINUTES=(zones['POWER_ZONE_SECONDS'] / 60).round(2))
+    by_week = zones.groupby(ATHLETE_WEEK, observed=True)
+    metrics = (by_week['POWER_ZONE_SECONDS'].sum() / 3600).round(2).rename('HOURS').to_frame().join(
+        totals.set_index(ATHLETE_WEEK)[['TSS', 'ENERGY']], how='outer'
+    ).reset_index()
+    metrics['TSS'] = metrics['TSS'].round(1)
+    metrics['ENERGY_KJ'] = (metrics['ENERGY'] / 1000).round(1)
+    metrics['USER_NAME_FIXED'] = metrics['USER_NAME_FIXED'].astype(str)
+    metrics.insert(2, 'WEEKS_PAST', week_index.weeks_past(metrics['WEEK_START'], this_week_start))
+    metrics = metrics.drop(columns='ENERGY')
+
+    # Percentages of the rounded minutes, as the Power Zones % tab computes them
+    zone_percent = zones[ATHLETE_WEEK + ['POWER_ZONE_LABEL']].assign(
+        POWER_ZONE_PERCENT=zones['MINUTES'] / by_week['MINUTES'].transform('sum') * 100,
+        # Rows are sorted by zone minimum, so this is the zone's place lowest first
+        ZONE_RANK=by_week.cumcount(),
+    )
+    zone_order = list(zone_percent.groupby('POWER_ZONE_LABEL', observed=True)['ZONE_RANK'].median().sort_values().index.astype(str))
+    zone_percent = zone_percent.drop(columns='ZONE_RANK').astype({'USER_NAME_FIXED': str, 'POWER_ZONE_LABEL': str})
+    return SquadSummary(metrics, zone_percent.reset_index(drop=True), zone_order)
@@ -1,19 +1,30 @@
 """
-Automated script to sync Training Peaks data from Snowflake to CSV
+Automated script to sync Training Peaks data from Snowflake to the local Parquet store
 This script runs on GitHub Actions to keep data fresh without direct Snowflake connection
 """
 
 import snowflake.connector
-import pandas as pd
 from datetime import datetime
 import os
 import sys
+import data_store
+import snowflake_fetch
+import rolling_state
 
-def sync_data_from_snowflake():
-    """Pull latest data from Snowflake and save to CSV"""
+def write_step_output(name, value):
+    """Expose a step output to later GitHub Actions steps (no-op when run locally)"""
+    output_path = os.environ.get('GITHUB_OUTPUT')
+    if not output_path:
+        return
+    with open(output_path, 'a') as f:
+        f.write(f"{name}={value}\n")
+
+def sync_data_from_snowflake(full_refresh=False):
+    """Pull latest data from Snowflake and save to the local Parquet store"""
     try:
         print("=" * 60)
-        print(f"Starting data sync at {datetime.now()}")
+        started = datetime.now()
+        print(f"Starting data sync at {started}")
         print("=" * 60)
         
         # Get credentials from environment variables (set in GitHub Secrets)
@@ -45,47 +56,55 @@ def sync_data_from_snowflake():
         
         print("✅ Successfully connected to Snowflake")
         
-        # Query the training peaks data
         table_name = "TRAINING_PEAKS_CYCLING_VW"
-        query = f"""
-        SELECT *
-        FROM {table_name}
-        ORDER BY START_TIME DESC
-        """
-        
-        print(f"Querying table: {table_name}")
-        df = pd.read_sql(query, conn)
-        conn.close()
+        previous_metadata = data_store.load_metadata()
         
-        print(f"✅ Retrieved {len(df)} rows from Snowflake")
+        # Cheap fingerprint first - if the view hasn't changed there's nothing to pull
+        fingerprint = snowflake_fetch.fetch_fingerprint(conn, table_name)
+        if data_store.sync_unchanged(previous_metadata, fingerprint, full_refresh):
+            conn.close()
+            # Later workflow steps skip the report and commit (changed=false)
+            write_step_output('changed', 'false')
+            print(f"✅ No changes since last sync ({fingerprint['row_count']} rows, latest {fingerprint['max_start_time']}) - skipping extraction")
+            return True
         
-        # Display column info
-        print(f"Columns: {list(df.columns)}")
+        # Only pull rows newer than the last sync (minus the look-back window)
+        since = data_store.get_sync_start(previous_metadata, full_refresh=full_refresh)
+        
+        # Query the training peaks data
+        query, params = data_store.build_extract_query(table_name, since)
         
-        # Save to CSV
-        csv_path = 'data/training_peaks_data.csv'
+        if since is None:
+            print(f"Querying table: {table_name} (full refresh)")
+        else:
+            print(f"Querying table: {table_name} (incremental since {since})")
+        rows_fetched = snowflake_fetch.fetch_into_store(conn, query, params, since)
+        conn.close()
         
-        # Create data directory if it doesn't exist
-        os.makedirs('data', exist_ok=True)
+        print(f"✅ Retrieved {rows_fetched} rows from Snowflake")
+        summary = data_store.store_summary()
         
-        # Save the data
-        df.to_csv(csv_path, index=False)
-        print(f"✅ Saved data to {csv_path}")
+        # Display column info
+        print(f"Columns: {summary['columns']}")
+        print(f"✅ Saved data to {data_store.PARQUET_DIR} ({summary['row_count']} rows in store)")
+        
+        # Pre-aggregate the weekly totals and zone seconds the dashboard charts read
+        total_rows, zone_rows, state_rows, recomputed = rolling_state.refresh_after_sync(since)
+        print(f"✅ Saved weekly summary ({total_rows} athlete-weeks, {zone_rows} athlete-week-zones)")
+        print(f"✅ Updated rolling averages ({recomputed} of {state_rows} athlete-metric-weeks recomputed)")
         
         # Create metadata file with sync info
         metadata = {
             'last_sync': datetime.now().isoformat(),
-            'row_count': len(df),
-            'columns': list(df.columns),
+            'row_count': summary['row_count'],
+            'columns': summary['columns'],
             'date_range': {
-                'earliest': str(df['START_TIME'].min()) if 'START_TIME' in df.columns else 'N/A',
-                'latest': str(df['START_TIME'].max()) if 'START_TIME' in df.columns else 'N/A'
+                'earliest': summary['earliest'] or 'N/A',
+                'latest': summary['latest'] or 'N/A'
             }
         }
-        
-        import json
-        with open('data/metadata.json', 'w') as f:
-            json.dump(metadata, f, indent=2)
+        data_store.finish_sync(metadata, summary, since, started, fingerprint)
+        write_step_output('changed', 'true')
         
         print(f"✅ Updated metadata")
         print(f"Date range: {metadata['date_range']['earliest']} to {metadata['date_range']['latest']}")
@@ -104,5 +123,5 @@ def sync_data_from_snowflake():
         return False
 
 if __name__ == "__main__":
-    success = sync_data_from_snowflake()
+    success = sync_data_from_snowflake(full_refresh=data_store.full_refresh_requested(sys.argv[1:]))
     sys.exit(0 if success else 1)
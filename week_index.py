@@ -0,0 +1,42 @@
+"""
+Monday-anchored week bucketing for whole datetime columns at once
+Week 0 is the current week, week 1 last week and so on
+"""
+
+import pandas as pd
+
+
+def get_today(tz=None):
+    """
+    Today's date as a naive midnight timestamp.
+    With tz (e.g. 'Pacific/Auckland') the date is taken in that timezone, so a
+    server running in UTC still rolls over to a new week on the athletes' Monday.
+    """
+    now = pd.Timestamp.now(tz=tz) if tz else pd.Timestamp.now()
+    return now.tz_localize(None).normalize() if now.tzinfo is not None else now.normalize()
+
+
+def week_start(times):
+    """Monday (00:00) of the week each timestamp falls in; tz-aware times are bucketed in their own timezone"""
+    times = pd.Series(times) if not isinstance(times, pd.Series) else times
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times)
+    if times.dt.tz is not None:
+        times = times.dt.tz_localize(None)
+    return times.dt.normalize() - pd.to_timedelta(times.dt.weekday, unit='D')
+
+
+def current_week_start(today=None, tz=None):
+    """Monday of the current week"""
+    today = get_today(tz) if today is None else pd.Timestamp(today).normalize()
+    return today - pd.Timedelta(days=today.weekday())
+
+
+def weeks_past(times, this_week_start):
+    """Whole weeks between each timestamp's week and the current week (0 = this week)"""
+    return (this_week_start - week_start(times)).dt.days // 7
+
+
+def week_start_for(weeks_back, this_week_start):
+    """Monday of the week `weeks_back` weeks before the current one"""
+    return this_week_start - pd.to_timedelta(pd.Series(weeks_back) * 7, unit='D')